@@ -235,7 +235,7 @@ Respond with ONLY the JSON plan and nothing else."""
             return False, raw_intent_or_error
 
         # Clean and validate the intent
-        intent = raw_intent_or_error.lower().strip().strip('`')
+        intent = raw_intent_or_error.lower().strip(' \t\n\r`')
         log.info(f"Intent classified as: '{intent}'")
         
         valid_intents = [
@@ -860,7 +860,7 @@ Command:"""
         if not success:
             return {'type': 'error', 'message': f"Failed to generate forensics command: {command}"}
         
-        command = command.strip().strip('`')
+        command = command.strip(' \t\n\r`')
         
         return self._prepare_for_execution({
             'type': 'command',
@@ -891,7 +891,7 @@ Command:"""
         if not success:
             return {'type': 'error', 'message': f"Failed to generate network command: {command}"}
         
-        command = command.strip().strip('`')
+        command = command.strip(' \t\n\r`')
         
         return self._prepare_for_execution({
             'type': 'command',
@@ -971,7 +971,7 @@ Command:"""
         if not success:
             return {'type': 'error', 'message': f"Failed to generate autonomous command: {generated_command}"}
         
-        command = generated_command.strip().strip('`').strip('"').strip("'")
+        command = generated_command.strip(' \t\n\r`"\'')
         
         if not command or len(command) < 3:
             return {'type': 'error', 'message': "Could not generate a valid command for your request"}
@@ -1124,7 +1124,7 @@ Here are your {num_options} option(s):"""
                 current_command = None
                 current_explanation = None
             elif line.lower().startswith('command:'):
-                current_command = line.split(':', 1)[1].strip().strip('`').strip('"').strip("'")
+                current_command = line.split(':', 1)[1].strip(' \t\n\r`"\'')
             elif line.lower().startswith('explanation:'):
                 current_explanation = line.split(':', 1)[1].strip()
             elif current_command and not current_explanation:
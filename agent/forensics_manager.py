@@ -12,6 +12,7 @@ Version: 3.0.0
 
 import os
 import json
+import shutil
 import subprocess
 from typing import Dict, List, Any, Optional
 from rich.console import Console
@@ -61,16 +62,8 @@ class ForensicsManager:
     
     def _get_available_tools(self) -> List[str]:
         """Check which forensics tools are available on the system."""
-        available = []
-        for tool_name in self.forensics_tools.keys():
-            try:
-                result = subprocess.run(['which', tool_name], 
-                                      capture_output=True, text=True, timeout=5)
-                if result.returncode == 0:
-                    available.append(tool_name)
-            except:
-                pass
-        return available
+        # shutil.which walks PATH in-process instead of forking `which` per tool
+        return [tool_name for tool_name in self.forensics_tools.keys() if shutil.which(tool_name)]
     
     def get_forensics_tools(self) -> Dict[str, Dict[str, Any]]:
         """Get all forensics tools."""
@@ -7,6 +7,9 @@ from typing import Dict, Any, Optional, Tuple
 from pathlib import Path
 from utils.logger import log
 
+# Maps SHA3 spellings like "sha3-256" onto the "sha3_256" form used internally
+_HASH_NORMALIZE = str.maketrans({'-': '_'})
+
 
 class HashHandler:
     """Handles hash generation and file saving requests"""
@@ -49,8 +52,8 @@ class HashHandler:
         for pattern, flags in cls.HASH_PATTERNS:
             match = re.search(pattern, user_input, flags)
             if match:
-                hash_type = match.group(1).lower().replace('-', '_')
-                input_text = match.group(2).strip().strip('"\'').strip()
+                hash_type = match.group(1).lower().translate(_HASH_NORMALIZE)
+                input_text = match.group(2).strip(' \t\n\r"\'')
                 break
         
         if not hash_type or not input_text:
@@ -66,7 +69,7 @@ class HashHandler:
             match = re.search(pattern, user_input, re.IGNORECASE)
             if match:
                 save_to_file = True
-                file_path = match.group(1).strip().strip('"\'').strip()
+                file_path = match.group(1).strip(' \t\n\r"\'')
                 # Remove file path part from input_text if it got captured
                 if file_path in input_text:
                     input_text = input_text.replace(f'save to {file_path}', '').replace(f'save as {file_path}', '').strip()
@@ -8,7 +8,8 @@
 
 import os
 import json
-from typing import Optional, List, Dict, Any, Tuple
+import types
+from typing import Optional, List, Dict, Any, Tuple, Mapping
 
 from agent.llm_engine import LLMEngine
 from utils.logger import log
@@ -43,7 +44,22 @@ class IntelligenceSelector:
         self.expert_role = expert_role
         self.tools = self._load_tool_registry()
         
-        log.info(f"IntelligenceSelector initialized with unified Librarian & Scholar capabilities for {expert_role} role")
+        # The registry is fixed after load, so derived views are built once and shared
+        self._tool_names = tuple(tool['name'] for tool in self.tools)
+        self._capabilities = types.MappingProxyType({
+            "name": "IntelligenceSelector",
+            "description": "Unified Tool Intelligence (Librarian & Scholar)",
+            "capabilities": (
+                "Tool Classification",
+                "Command Composition",
+                "Parameter Registry Analysis",
+                "Unified Intelligence Pipeline"
+            ),
+            "tools_available": len(self.tools),
+            "registries_path": self.registries_dir_path
+        })
+        
+        log.info("IntelligenceSelector initialized with unified Librarian & Scholar capabilities for %s role", expert_role)
     
     def _load_tool_registry(self) -> List[Dict[str, Any]]:
         """
@@ -58,10 +74,10 @@ class IntelligenceSelector:
         """
         try:
             with open(self.registry_path, 'r') as f:
-                log.info(f"Loading simplified tool registry from {self.registry_path}")
+                log.info("Loading simplified tool registry from %s", self.registry_path)
                 return json.load(f)
         except (FileNotFoundError, json.JSONDecodeError) as e:
-            log.critical(f"FATAL: Could not load tool registry at {self.registry_path}: {e}")
+            log.critical("FATAL: Could not load tool registry at %s: %s", self.registry_path, e)
             raise
     
     def _load_parameter_registry(self, tool_name: str) -> Optional[Dict[str, Any]]:
@@ -77,13 +93,13 @@ class IntelligenceSelector:
         registry_file = os.path.join(self.registries_dir_path, f"{tool_name}_registry.json")
         try:
             with open(registry_file, 'r') as f:
-                log.info(f"Loading parameter registry: {registry_file}")
+                log.info("Loading parameter registry: %s", registry_file)
                 return json.load(f)
         except FileNotFoundError:
-            log.error(f"Parameter registry not found for tool '{tool_name}' at {registry_file}")
+            log.error("Parameter registry not found for tool '%s' at %s", tool_name, registry_file)
             return None
         except json.JSONDecodeError:
-            log.error(f"Invalid JSON in parameter registry: {registry_file}")
+            log.error("Invalid JSON in parameter registry: %s", registry_file)
             return None
     
     # ==========================================
@@ -103,7 +119,7 @@ class IntelligenceSelector:
         Returns:
             The tool name (e.g., "nmap") or None if no suitable tool is found
         """
-        log.info(f"Librarian function: selecting tool for '{user_input}'")
+        log.info("Librarian function: selecting tool for '%s'", user_input)
         
         # Construct a focused classification prompt with role consideration
         prompt = (
@@ -116,11 +132,11 @@ class IntelligenceSelector:
             "TOOL NAME:"
         )
         
-        # Use fast triage model for quick classification
-        success, response_or_error = self.llm_engine.generate_response(prompt)
+        # Use fast triage model for quick classification; the answer is a single word
+        success, response_or_error = self.llm_engine.generate_response(prompt, max_tokens=8)
         
         if not success:
-            log.error(f"Tool selection LLM call failed: {response_or_error}")
+            log.error("Tool selection LLM call failed: %s", response_or_error)
             return None
         
         # Clean and validate the response
@@ -128,10 +144,10 @@ class IntelligenceSelector:
         
         # Validate that the tool exists in our registry
         if any(t['name'] == tool_name for t in self.tools):
-            log.info(f"Tool selected: '{tool_name}'")
+            log.info("Tool selected: '%s'", tool_name)
             return tool_name
         else:
-            log.warning(f"LLM returned unknown tool '{tool_name}'. No match found.")
+            log.warning("LLM returned unknown tool '%s'. No match found.", tool_name)
             return None
     
     # ==========================================
@@ -153,12 +169,12 @@ class IntelligenceSelector:
         Returns:
             Complete executable command string or None on failure
         """
-        log.info(f"Scholar function: composing '{tool_name}' command for '{user_request}'")
+        log.info("Scholar function: composing '%s' command for '%s'", tool_name, user_request)
         
         # Load the detailed parameter registry for this tool
         param_registry = self._load_parameter_registry(tool_name)
         if not param_registry:
-            log.error(f"Cannot compose command without parameter registry for '{tool_name}'")
+            log.error("Cannot compose command without parameter registry for '%s'", tool_name)
             return None
         
         # Check if this tool requires multi-step workflow
@@ -190,21 +206,21 @@ class IntelligenceSelector:
             "FINAL COMMAND:"
         )
         
-        # Use high-quality model for complex reasoning
-        success, response_or_error = self.llm_engine.generate_response(prompt)
+        # Use high-quality model for complex reasoning; the answer is a short shell line
+        success, response_or_error = self.llm_engine.generate_response(prompt, max_tokens=256)
         
         if not success:
-            log.error(f"Command composition LLM call failed: {response_or_error}")
+            log.error("Command composition LLM call failed: %s", response_or_error)
             return None
         
         # Clean and validate the response
-        command = response_or_error.strip().strip('`')
+        command = response_or_error.strip(' \t\n\r`')
         
         if not command.startswith(tool_name):
-            log.warning(f"Composed command doesn't start with tool name: '{command}'")
+            log.warning("Composed command doesn't start with tool name: '%s'", command)
             # Continue anyway - trust the high-quality model
         
-        log.info(f"Command composed: {command}")
+        log.info("Command composed: %s", command)
         return command
     
     # ==========================================
@@ -228,7 +244,7 @@ class IntelligenceSelector:
             - tool_name: The selected tool name (for logging/display)
             - command: The final executable command string
         """
-        log.info(f"Processing unified tool request: '{user_request}'")
+        log.info("Processing unified tool request: '%s'", user_request)
         
         # Step 1: Librarian - Select the appropriate tool
         tool_name = self.select_tool(user_request)
@@ -239,24 +255,24 @@ class IntelligenceSelector:
         # Step 2: Scholar - Compose the precise command
         command = self.compose_command(user_request, tool_name)
         if not command:
-            log.warning(f"Command composition failed for tool '{tool_name}'")
+            log.warning("Command composition failed for tool '%s'", tool_name)
             return False, tool_name, None
         
-        log.info(f"Unified intelligence pipeline completed successfully: {tool_name} -> {command}")
+        log.info("Unified intelligence pipeline completed successfully: %s -> %s", tool_name, command)
         return True, tool_name, command
     
     # ==========================================
     # UTILITY METHODS
     # ==========================================
     
-    def get_available_tools(self) -> List[str]:
+    def get_available_tools(self) -> Tuple[str, ...]:
         """
-        Returns a list of all available tool names.
+        Returns all available tool names.
         
         Returns:
-            List of tool names from the registry
+            Tuple of tool names from the registry (wrap in list() if mutation is needed)
         """
-        return [tool['name'] for tool in self.tools]
+        return self._tool_names
     
     def get_tool_info(self, tool_name: str) -> Optional[Dict[str, Any]]:
         """
@@ -273,22 +289,11 @@ class IntelligenceSelector:
                 return tool
         return None
     
-    def get_capabilities_summary(self) -> Dict[str, Any]:
+    def get_capabilities_summary(self) -> Mapping[str, Any]:
         """
         Returns a summary of IntelligenceSelector capabilities.
         
         Returns:
-            Dictionary containing capability information
+            Read-only mapping containing capability information, computed once at init
         """
-        return {
-            "name": "IntelligenceSelector",
-            "description": "Unified Tool Intelligence (Librarian & Scholar)",
-            "capabilities": [
-                "Tool Classification",
-                "Command Composition",
-                "Parameter Registry Analysis",
-                "Unified Intelligence Pipeline"
-            ],
-            "tools_available": len(self.tools),
-            "registries_path": self.registries_dir_path
-        }
+        return self._capabilities
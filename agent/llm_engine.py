@@ -5,12 +5,79 @@
 # providing a stable, reliable, and high-performance cloud AI solution.
 
 import os
-from typing import Dict, Any, Tuple
+import asyncio
+import functools
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Tuple, Optional, Iterator, Union, List
 
 import google.generativeai as genai
 
+try:
+    import xxhash  # Optional: faster prompt hashing for the response cache
+except ImportError:
+    xxhash = None
+
 from utils.logger import log
 
+# Upper bound on cached Gemini answers when LINA_LLM_CACHE=1
+RESPONSE_CACHE_MAXSIZE = 2048
+
+# Gemini calls allowed in flight at once per engine; override with LINA_LLM_CONCURRENCY
+DEFAULT_LLM_CONCURRENCY = 8
+
+
+def _prompt_key(prompt: str, *params: Any) -> Union[int, bytes]:
+    """
+    Hashes a prompt and its generation parameters into a compact cache key.
+    
+    Args:
+        prompt: The full prompt text
+        *params: Generation parameters that change the answer (token limit, stop sequences)
+        
+    Returns:
+        64-bit xxh3 digest when xxhash is installed, otherwise an 8-byte blake2b digest
+    """
+    data = f"{params!r}\0{prompt}".encode('utf-8')
+    if xxhash is not None:
+        return xxhash.xxh3_64_intdigest(data)
+    return hashlib.blake2b(data, digest_size=8).digest()
+
+
+class _SlotHeldStream:
+    """
+    Iterator over a Gemini stream's text that keeps an LLMEngine call slot until
+    the stream is exhausted, fails, is closed or is garbage collected.
+    """
+    
+    def __init__(self, chunks: Iterator[Any], slots: threading.BoundedSemaphore):
+        self._chunks = chunks
+        self._slots = slots
+        self._released = False
+    
+    def __iter__(self) -> "_SlotHeldStream":
+        return self
+    
+    def __next__(self) -> str:
+        if self._released:
+            raise StopIteration
+        try:
+            return next(self._chunks).text
+        except BaseException:
+            # StopIteration included: the slot is freed as soon as the stream ends
+            self.close()
+            raise
+    
+    def close(self) -> None:
+        """Abandons the rest of the stream and frees the call slot."""
+        if not self._released:
+            self._released = True
+            self._slots.release()
+    
+    def __del__(self):
+        self.close()
+
 
 class LLMEngine:
     """
@@ -32,6 +99,16 @@ class LLMEngine:
         self.config = config
         self.google_model = None
         
+        # Optional LRU of answers keyed by prompt hash, shared by every agent using this engine
+        self.response_cache_enabled = os.getenv('LINA_LLM_CACHE') == '1'
+        self._response_cache: "OrderedDict[Union[int, bytes], str]" = OrderedDict()
+        self._response_cache_lock = threading.Lock()
+        
+        # Bounds concurrent Gemini round trips so bursts of API requests queue here
+        # instead of all hitting the provider's rate limits at once
+        concurrency = int(os.getenv('LINA_LLM_CONCURRENCY') or DEFAULT_LLM_CONCURRENCY)
+        self._call_slots = threading.BoundedSemaphore(max(1, concurrency))
+        
         # Setup Google Gemini
         self._setup_google_gemini()
     
@@ -70,13 +147,18 @@ class LLMEngine:
         """
         return self.google_model is not None
     
-    def generate_response(self, prompt: str, is_json: bool = False) -> Tuple[bool, str]:
+    def generate_response(self, prompt: str, is_json: bool = False,
+                          max_tokens: Optional[int] = None,
+                          stop: Optional[List[str]] = None) -> Tuple[bool, str]:
         """
         Generates a response using Google Gemini.
         
         Args:
             prompt: The prompt to send to the AI
             is_json: If True, instructs the AI to format response as JSON
+            max_tokens: Optional cap on output tokens; when set, decoding is also
+                made deterministic (temperature 0) for short, well-shaped answers
+            stop: Optional stop sequences (Gemini accepts up to 5) that end generation early
             
         Returns:
             Tuple of (success: bool, content: str)
@@ -88,14 +170,152 @@ class LLMEngine:
         if is_json:
             prompt = f"{prompt}\n\nPlease format your response as valid JSON."
         
-        return self._call_google_gemini(prompt)
+        if not self.response_cache_enabled:
+            return self._call_google_gemini(prompt, self._build_generation_config(max_tokens, stop))
+        
+        cache_key = _prompt_key(prompt, max_tokens, tuple(stop) if stop else None)
+        cached = self._cached_response(cache_key)
+        if cached is not None:
+            return True, cached
+        
+        success, response = self._call_google_gemini(prompt, self._build_generation_config(max_tokens, stop))
+        
+        # Only successful answers are cached so transient failures are retried
+        if success:
+            with self._response_cache_lock:
+                self._response_cache[cache_key] = response
+                if len(self._response_cache) > RESPONSE_CACHE_MAXSIZE:
+                    self._response_cache.popitem(last=False)
+        
+        return success, response
+    
+    async def agenerate_response(self, prompt: str, is_json: bool = False,
+                                 max_tokens: Optional[int] = None,
+                                 stop: Optional[List[str]] = None) -> Tuple[bool, str]:
+        """
+        Awaitable generate_response for use from async code such as API endpoints.
+        
+        Cache hits return without leaving the event loop; misses run the blocking
+        Gemini call (including its retries) in the loop's default executor, where
+        it waits for one of the LINA_LLM_CONCURRENCY call slots.
+        
+        Args:
+            prompt: The prompt to send to the AI
+            is_json: If True, instructs the AI to format response as JSON
+            max_tokens: Optional cap on output tokens (see generate_response)
+            stop: Optional stop sequences (see generate_response)
+            
+        Returns:
+            Tuple of (success: bool, content: str)
+        """
+        if self.response_cache_enabled and self.is_ready():
+            full_prompt = f"{prompt}\n\nPlease format your response as valid JSON." if is_json else prompt
+            cached = self._cached_response(_prompt_key(full_prompt, max_tokens, tuple(stop) if stop else None))
+            if cached is not None:
+                return True, cached
+        
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None, functools.partial(self.generate_response, prompt, is_json, max_tokens, stop)
+        )
+    
+    def _cached_response(self, cache_key: Union[int, bytes]) -> Optional[str]:
+        """
+        Looks up a cached answer and marks it most recently used.
+        
+        Args:
+            cache_key: Key from _prompt_key
+            
+        Returns:
+            The cached answer or None on a miss
+        """
+        with self._response_cache_lock:
+            cached = self._response_cache.get(cache_key)
+            if cached is not None:
+                self._response_cache.move_to_end(cache_key)
+        if cached is not None:
+            log.info("Using cached Gemini response")
+        return cached
+    
+    def clear_cache(self) -> None:
+        """Drops every cached response."""
+        with self._response_cache_lock:
+            self._response_cache.clear()
+    
+    def generate_response_stream(self, prompt: str,
+                                 max_tokens: Optional[int] = None,
+                                 stop: Optional[List[str]] = None) -> Tuple[bool, Union[Iterator[str], str]]:
+        """
+        Generates a response using Google Gemini, yielding text as it is decoded.
+        
+        The stream holds one of the LINA_LLM_CONCURRENCY call slots from the request
+        until it is exhausted or closed, so callers that only need the start of the
+        answer should close() it after they stop iterating. Cached answers and
+        streams that fail to start are served through generate_response (with its
+        retries) as a single chunk. Errors after the stream has started are raised
+        from the iterator; callers should fall back to generate_response.
+        
+        Args:
+            prompt: The prompt to send to the AI
+            max_tokens: Optional cap on output tokens (see generate_response)
+            stop: Optional stop sequences (see generate_response)
+            
+        Returns:
+            Tuple of (success: bool, chunks: Iterator[str] or error message: str)
+        """
+        if not self.is_ready():
+            return False, "Google Gemini is not configured. Please check your GOOGLE_API_KEY."
+        
+        if self.response_cache_enabled:
+            cached = self._cached_response(_prompt_key(prompt, max_tokens, tuple(stop) if stop else None))
+            if cached is not None:
+                return True, iter((cached,))
+        
+        self._call_slots.acquire()
+        try:
+            response = self.google_model.generate_content(
+                prompt,
+                generation_config=self._build_generation_config(max_tokens, stop),
+                stream=True,
+                request_options={"timeout": 45}
+            )
+        except Exception as e:
+            self._call_slots.release()
+            log.warning(f"Google Gemini streaming call failed to start, using a blocking call: {e}")
+            success, response_or_error = self.generate_response(prompt, max_tokens=max_tokens, stop=stop)
+            return (True, iter((response_or_error,))) if success else (False, response_or_error)
+        
+        return True, _SlotHeldStream(iter(response), self._call_slots)
+    
+    @staticmethod
+    def _build_generation_config(max_tokens: Optional[int], stop: Optional[List[str]]) -> Optional[Any]:
+        """
+        Builds a Gemini GenerationConfig for bounded output, or None to use the model defaults.
+        
+        Args:
+            max_tokens: Optional cap on output tokens; also pins temperature to 0
+            stop: Optional stop sequences
+            
+        Returns:
+            GenerationConfig instance or None
+        """
+        if max_tokens is None and not stop:
+            return None
+        config_kwargs: Dict[str, Any] = {}
+        if max_tokens is not None:
+            config_kwargs['max_output_tokens'] = max_tokens
+            config_kwargs['temperature'] = 0.0
+        if stop:
+            config_kwargs['stop_sequences'] = list(stop)
+        return genai.GenerationConfig(**config_kwargs)
     
-    def _call_google_gemini(self, prompt: str) -> Tuple[bool, str]:
+    def _call_google_gemini(self, prompt: str, generation_config: Optional[Any] = None) -> Tuple[bool, str]:
         """
         Calls Google Gemini API with proper error handling, timeout, and retry logic.
         
         Args:
             prompt: The prompt to send to Gemini
+            generation_config: Optional GenerationConfig passed through to Gemini
             
         Returns:
             Tuple of (success: bool, response: str)
@@ -116,7 +336,12 @@ class LLMEngine:
                 
                 # Configure request with progressive timeout
                 request_options = {"timeout": timeout}
-                response = self.google_model.generate_content(prompt, request_options=request_options)
+                with self._call_slots:
+                    response = self.google_model.generate_content(
+                        prompt,
+                        generation_config=generation_config,
+                        request_options=request_options
+                    )
                 
                 # Handle blocked responses
                 if not response.parts:
@@ -4,67 +4,654 @@
 # This definitive version implements a two-layered, hybrid risk assessment system:
 # - Layer 1 (Static Guard): Instantly checks commands against a local database
 #   of known risky patterns using regex. This is extremely fast and costs nothing.
-# - Layer 2 (Intelligent Analyst): If no static match is found, it queries the
-#   LLM for a dynamic, intelligent assessment of the command's potential risk.
+# - Layer 2 (Intelligent Analyst): Unless the static match is already decisive
+#   (CRITICAL, or SAFE for a plain command), it queries the LLM for a dynamic,
+#   intelligent assessment of the command's potential risk.
 # It correctly receives its dependencies (router, paths) via injection from the Brain
 # and provides more context-aware assessments for tools with arguments.
 
 import os
+import atexit
 import json
 import re
-from typing import Optional, Dict, Any
+import functools
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, List, Tuple
 
 from agent.llm_engine import LLMEngine
 from utils.logger import log
 
+try:
+    import ahocorasick  # Optional: pyahocorasick accelerates literal risk patterns
+except ImportError:
+    ahocorasick = None
+
+try:
+    import orjson  # Optional: faster JSON for args serialization and the verdict cache
+except ImportError:
+    orjson = None
+
+try:
+    import re2  # Optional: google-re2 scans all regex risk patterns in one linear-time pass
+except ImportError:
+    re2 = None
+
+# Characters that make a risk pattern a real regex rather than a plain literal
+_REGEX_METACHARS = frozenset('\\.^$*+?{}[]|()')
+
+# Quantifiers that make the preceding character optional or repeatable
+_REGEX_QUANTIFIERS = frozenset('*?{')
+
+# Static verdicts that are trusted without asking the LLM
+DECISIVE_STATIC_LEVELS = frozenset(('CRITICAL', 'SAFE'))
+
+# Shell operators that can chain or redirect a command, so a SAFE prefix match says nothing about the rest
+_SHELL_OPERATOR_CHARS = frozenset(';&|<>`$\n')
+
+# Risk levels ranked from least to most severe. A missing verdict (None) ranks lowest and,
+# if neither layer produced one, reads back as UNKNOWN; unrecognised labels rank as UNKNOWN.
+RISK_PRIORITY = {
+    None: 0,
+    'SAFE': 1,
+    'UNKNOWN': 2,
+    'LOW': 3,
+    'MEDIUM': 4,
+    'HIGH': 5,
+    'RISKY': 6,
+    'BLOCKED': 7,
+    'CRITICAL': 8
+}
+RISK_LABELS = ('UNKNOWN', 'SAFE', 'UNKNOWN', 'LOW', 'MEDIUM', 'HIGH', 'RISKY', 'BLOCKED', 'CRITICAL')
+_UNKNOWN_PRIORITY = RISK_PRIORITY['UNKNOWN']
+
+# Maximum number of assessments remembered by RiskManager's in-memory LRU cache
+ASSESS_CACHE_MAXSIZE = 1024
+
+# Length of the "Risky:" verdict prefix returned by the LLM
+_RISKY_PREFIX_LEN = len("risky:")
+
+# The verdict is "Safe" or a one-sentence "Risky: ..." line, so decoding is capped and
+# stopped at the first blank line or section marker instead of running to the model default
+AI_VERDICT_MAX_TOKENS = 80
+AI_VERDICT_STOP_SEQUENCES = ["\n\n", "###"]
+
+# Persisted LLM verdicts older than this are evicted when a RiskManager starts
+RISK_CACHE_TTL_DAYS = 7
+
+# Default location of the persistent verdict cache, next to the session history database
+DEFAULT_RISK_CACHE_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'db', 'risk_cache.sqlite')
+
+# Default location of the prompt used for LLM-based risk analysis
+RISK_PROMPT_PATH = os.path.join(os.path.dirname(__file__), "prompts", "risk_prompt.txt")
+
+
+def _json_dumps(obj: Any, sort_keys: bool = False) -> str:
+    """Serializes to a JSON string with orjson when available, falling back to the json module."""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_SORT_KEYS if sort_keys else 0)
+        return orjson.dumps(obj, default=str, option=option).decode('utf-8')
+    return json.dumps(obj, sort_keys=sort_keys, default=str)
+
+
+def _json_loads(data: Any) -> Any:
+    """Parses JSON with orjson when available, falling back to the json module."""
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def _literal_prefix_length(pattern: str) -> int:
+    """
+    Length of the literal text a pattern must start with (ignoring a leading ``^``).
+    Used as a cheap selectivity estimate: a longer literal prefix is a more specific rule.
+    """
+    body = pattern[1:] if pattern.startswith('^') else pattern
+    for position, char in enumerate(body):
+        if char in _REGEX_METACHARS:
+            # A quantifier applies to the previous character, so that one is not guaranteed either
+            return max(position - 1, 0) if char in _REGEX_QUANTIFIERS else position
+    return len(body)
+
+
+_QUANTIFIER_BRACE_RE = re.compile(r'\{\d*(?:,\d*)?\}')
+
+# Inline flags such as (?i) or (?m); they apply to a whole pattern, so it cannot join a union
+_INLINE_FLAGS_RE = re.compile(r'\(\?[aiLmsux]+\)')
+
+
+def _split_top_level_alternatives(pattern: str) -> List[str]:
+    """Splits a pattern on ``|`` that is not inside a group, character class or escape."""
+    branches, current, depth, in_class, i = [], "", 0, False, 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == '\\':
+            current += pattern[i:i + 2]
+            i += 2
+            continue
+        if in_class:
+            in_class = char != ']'
+        elif char == '[':
+            in_class = True
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == '|' and depth == 0:
+            branches.append(current)
+            current = ""
+            i += 1
+            continue
+        current += char
+        i += 1
+    branches.append(current)
+    return branches
+
+
+def _is_unionable(pattern: str, compiled: "re.Pattern[str]") -> bool:
+    """
+    Whether a pattern keeps its meaning as one branch of the combined alternation.
+
+    The union reports the leftmost match, so it only agrees with the per-pattern loop
+    (first pattern in priority order wins) when every branch is anchored with ``^`` and
+    can only match at the start. Groups would be renumbered inside the union, breaking
+    backreferences, so patterns with any group are kept out as well.
+    """
+    if compiled.groups or _INLINE_FLAGS_RE.search(pattern):
+        return False
+    return all(branch.startswith('^') for branch in _split_top_level_alternatives(pattern))
+
+
+def _required_literal(branch: str) -> str:
+    """
+    Returns the longest literal run that any match of ``branch`` must contain, or ""
+    if none can be proven. Groups and character classes are skipped, and characters
+    made optional by a quantifier are dropped, so the result is always sound.
+    """
+    runs, current, i = [], "", 0
+    while i < len(branch):
+        char = branch[i]
+        if char == '\\':
+            escaped = branch[i + 1:i + 2]
+            if escaped.isalnum() or not escaped:
+                runs.append(current)  # Class escapes such as \d or \b are not literals
+                current = ""
+            else:
+                current += escaped
+            i += 2
+            continue
+        if char in '([':
+            runs.append(current)
+            current = ""
+            closing = ')' if char == '(' else ']'
+            depth = 0
+            while i < len(branch):
+                if branch[i] == '\\':
+                    i += 2
+                    continue
+                if char == '(' and branch[i] == '(':
+                    depth += 1
+                elif branch[i] == closing:
+                    depth -= 1
+                    if depth <= 0:
+                        break
+                i += 1
+            i += 1
+            continue
+        quantifier = _QUANTIFIER_BRACE_RE.match(branch, i) if char == '{' else None
+        if char in '*?' or quantifier:
+            # The preceding character may be absent, so it cannot be part of a required run
+            runs.append(current[:-1])
+            current = ""
+            i = quantifier.end() if quantifier else i + 1
+            continue
+        if char in '+.^$)|':
+            runs.append(current)
+            current = ""
+        else:
+            current += char
+        i += 1
+    runs.append(current)
+    return max(runs, key=len)
+
+
+@functools.lru_cache(maxsize=None)
+def _load_risk_database_file(path: str) -> Dict[str, Any]:
+    """Parses a risk database once per resolved path and shares it between RiskManager instances."""
+    try:
+        with open(path, 'r') as f:
+            log.info(f"Static risk database loaded from {path}.")
+            return _json_loads(f.read())
+    except (FileNotFoundError, json.JSONDecodeError) as e:
+        log.error(f"Could not load or parse static risk database at {path}: {e}. Static checks will be disabled.")
+        return {}
+
+
+@functools.lru_cache(maxsize=None)
+def _load_prompt_template_file(path: str) -> str:
+    """Reads a prompt template once per resolved path."""
+    with open(path, 'r', encoding="utf-8") as f:
+        return f.read()
+
+
+@functools.lru_cache(maxsize=256)
+def _serialize_frozen_args(frozen_args: Tuple[Tuple[str, type, Any], ...]) -> str:
+    """JSON-encodes a frozen args tuple; memoized because tools are re-assessed with the same args."""
+    return _json_dumps({key: value for key, _, value in frozen_args}, sort_keys=True)
+
+
+def _serialize_args(args: Dict[str, Any]) -> str:
+    """Canonical JSON form of tool args, shared by the cache key and the LLM prompt."""
+    try:
+        # The value type is part of the key so that 1, 1.0 and True do not share an entry
+        frozen_args = tuple((key, type(value), value) for key, value in sorted(args.items()))
+        return _serialize_frozen_args(frozen_args)
+    except TypeError:
+        # Unhashable (nested) values or unsortable keys: serialize directly
+        return _json_dumps(args, sort_keys=True)
+
+
 class RiskManager:
     """
     Assesses command risk using a two-layered static and dynamic approach.
     It is the final safety gate before any command is executed.
     """
-    def __init__(self, llm_engine: LLMEngine, risk_database_path: str):
+    def __init__(self, llm_engine: LLMEngine, risk_database_path: str, risk_cache_path: Optional[str] = None):
         """
         Initializes the RiskManager.
         Args:
             llm_engine: An instance of the LLMEngine for AI reasoning.
             risk_database_path: The absolute path to the risk_database.json file.
+            risk_cache_path: Optional path of the SQLite file that persists LLM verdicts
+                across restarts (defaults to data/db/risk_cache.sqlite).
         """
         self.llm_engine = llm_engine
         self.risk_database_path = risk_database_path
+        # Development override: always run the LLM layer, even after a decisive static match
+        self.force_ai_assessment = os.getenv('LINA_FORCE_AI_RISK') == '1'
+        # Opt-in: start the LLM call before the static check and abandon it on a decisive match.
+        # Off by default because every decisive match then costs an API call that is thrown away.
+        # Combined with LINA_FORCE_AI_RISK nothing is ever abandoned, so the overlap is pure gain.
+        self._ai_executor: Optional[ThreadPoolExecutor] = None
+        if os.getenv('LINA_OVERLAP_AI_RISK') == '1':
+            self._ai_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="lina-risk-ai")
+            # Don't let an in-flight, already abandoned LLM call hold up interpreter exit
+            atexit.register(self._ai_executor.shutdown, wait=False)
+        # LRU of completed assessments; identical (command, args) pairs skip the LLM round-trip
+        self._assess_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        # assess_risk runs on API threadpool workers, so LRU reads and updates are serialized
+        self._assess_cache_lock = threading.Lock()
+        self.risk_cache_path = risk_cache_path or DEFAULT_RISK_CACHE_PATH
+        self._risk_cache_lock = threading.Lock()
+        self.risk_cache_conn = self._connect_risk_cache()
+        self._load_static_layer()
+        self.prompt_template = self._load_prompt_template()
+        self._sync_risk_cache_version()
+
+    def _load_static_layer(self):
+        """Loads the risk database and builds the matchers used by Layer 1."""
         self.risk_database = self._load_risk_database()
+        self.compiled_patterns = self._compile_risk_patterns()
+        self.index_to_info = {i: (pattern, risk_info) for i, (pattern, _, risk_info) in enumerate(self.compiled_patterns)}
+        self.literal_automaton, literal_indices = self._build_literal_automaton()
+        self.regex_indices = [i for i in range(len(self.compiled_patterns)) if i not in literal_indices]
+        self.static_triggers = self._build_static_triggers()
+        self.regex_set = self._build_regex_set()
+        if self.regex_set is not None:
+            self.combined_re, self.standalone_regex_indices = None, []
+        else:
+            self.combined_re, self.standalone_regex_indices = self._build_combined_pattern()
+
+    def reload(self):
+        """Re-reads the risk database and prompt from disk, e.g. after editing risk_database.json."""
+        _load_risk_database_file.cache_clear()
+        _load_prompt_template_file.cache_clear()
+        self._load_static_layer()
         self.prompt_template = self._load_prompt_template()
+        with self._assess_cache_lock:
+            self._assess_cache.clear()
+        # Persisted verdicts embed the old database match, so they are dropped if it changed
+        self._sync_risk_cache_version()
+        log.info("RiskManager reloaded risk database and prompt template.")
+
+    def close(self):
+        """Stops the overlap executor (if any) and closes the persistent verdict cache."""
+        if self._ai_executor is not None:
+            atexit.unregister(self._ai_executor.shutdown)
+            self._ai_executor.shutdown(wait=False)
+            self._ai_executor = None
+        # Cleared under the lock so later lookups see None and skip persistence
+        with self._risk_cache_lock:
+            if self.risk_cache_conn is not None:
+                self.risk_cache_conn.close()
+                self.risk_cache_conn = None
+
+    def _connect_risk_cache(self) -> Optional[sqlite3.Connection]:
+        """
+        Opens the persistent verdict cache, creating its table and evicting stale entries.
+        Returns None (persistence disabled) if the database cannot be opened.
+        """
+        try:
+            os.makedirs(os.path.dirname(self.risk_cache_path), exist_ok=True)
+            conn = sqlite3.connect(self.risk_cache_path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS risk_cache (
+                cmd_hash TEXT PRIMARY KEY,
+                verdict_json TEXT NOT NULL,
+                ts REAL NOT NULL
+            )
+            """)
+            conn.execute("DELETE FROM risk_cache WHERE ts < ?", (time.time() - RISK_CACHE_TTL_DAYS * 86400,))
+            conn.commit()
+            log.info(f"Persistent risk cache ready at {self.risk_cache_path}")
+            return conn
+        except (OSError, sqlite3.Error) as e:
+            log.warning(f"Could not open persistent risk cache at {self.risk_cache_path}: {e}. Verdicts will not persist.")
+            return None
+
+    def _risk_cache_version(self) -> int:
+        """
+        Fingerprint of everything a persisted verdict depends on: the loaded risk
+        database, the risk level ranking and the LLM prompt. Fits SQLite's 32-bit
+        signed PRAGMA user_version.
+        """
+        fingerprint = _json_dumps(
+            [self.risk_database, sorted(RISK_PRIORITY.items(), key=str), self.prompt_template], sort_keys=True
+        )
+        digest = hashlib.blake2b(fingerprint.encode('utf-8'), digest_size=4).digest()
+        return int.from_bytes(digest, 'big') & 0x7FFFFFFF
+
+    def _sync_risk_cache_version(self):
+        """Drops persisted verdicts produced under a different risk database, ranking or prompt."""
+        if self.risk_cache_conn is None:
+            return
+        version = self._risk_cache_version()
+        try:
+            with self._risk_cache_lock:
+                if self.risk_cache_conn is None:
+                    return
+                stored = self.risk_cache_conn.execute("PRAGMA user_version").fetchone()[0]
+            if stored == version:
+                return
+            self._clear_risk_cache()
+            with self._risk_cache_lock:
+                if self.risk_cache_conn is None:
+                    return
+                # PRAGMA values cannot be bound as parameters; version is an int we computed
+                self.risk_cache_conn.execute(f"PRAGMA user_version = {version}")
+                self.risk_cache_conn.commit()
+            log.info("Risk rules changed since verdicts were persisted; persistent risk cache cleared.")
+        except sqlite3.Error as e:
+            log.warning(f"Could not check persistent risk cache version: {e}")
+
+    @staticmethod
+    def _hash_cache_key(cache_key: str) -> str:
+        """Fixed-width digest of a cache key, used as the persistent cache's primary key."""
+        return hashlib.blake2b(cache_key.encode('utf-8'), digest_size=16).hexdigest()
+
+    def _load_persisted_assessment(self, cache_key: str) -> Optional[Dict[str, str]]:
+        """Looks an assessment up in the persistent cache."""
+        if self.risk_cache_conn is None:
+            return None
+        try:
+            with self._risk_cache_lock:
+                # close() may have run since the check above
+                if self.risk_cache_conn is None:
+                    return None
+                row = self.risk_cache_conn.execute(
+                    "SELECT verdict_json FROM risk_cache WHERE cmd_hash = ?", (self._hash_cache_key(cache_key),)
+                ).fetchone()
+            return _json_loads(row[0]) if row else None
+        except (sqlite3.Error, json.JSONDecodeError) as e:
+            log.warning(f"Persistent risk cache lookup failed: {e}")
+            return None
+
+    def _persist_assessments(self, entries: List[Tuple[str, Dict[str, str]]]):
+        """Writes (cache_key, assessment) pairs to the persistent cache in one transaction."""
+        if self.risk_cache_conn is None or not entries:
+            return
+        now = time.time()
+        rows = [(self._hash_cache_key(cache_key), _json_dumps(assessment), now) for cache_key, assessment in entries]
+        try:
+            with self._risk_cache_lock:
+                if self.risk_cache_conn is None:
+                    return
+                self.risk_cache_conn.executemany(
+                    "INSERT OR REPLACE INTO risk_cache (cmd_hash, verdict_json, ts) VALUES (?, ?, ?)", rows
+                )
+                self.risk_cache_conn.commit()
+        except sqlite3.Error as e:
+            log.warning(f"Could not persist risk verdicts: {e}")
+
+    def _clear_risk_cache(self):
+        """Empties the persistent cache."""
+        if self.risk_cache_conn is None:
+            return
+        try:
+            with self._risk_cache_lock:
+                if self.risk_cache_conn is None:
+                    return
+                self.risk_cache_conn.execute("DELETE FROM risk_cache")
+                self.risk_cache_conn.commit()
+        except sqlite3.Error as e:
+            log.warning(f"Could not clear persistent risk cache: {e}")
 
     def _load_risk_database(self) -> Dict[str, Any]:
         """Loads the static risk database from the provided path."""
+        return _load_risk_database_file(os.path.realpath(self.risk_database_path))
+
+    def _compile_risk_patterns(self) -> List[Tuple[str, "re.Pattern[str]", Dict[str, Any]]]:
+        """
+        Precompiles every risk database pattern once so command checks skip the re module cache.
+        Invalid patterns are reported here, at startup, instead of on every command.
+
+        Duplicate patterns (after trimming whitespace) are dropped, and the rest are ordered
+        by selectivity - longest literal prefix first, database order otherwise - so that when
+        several entries match, the most specific rule (``^echo .* > /dev/mem`` rather than
+        ``^echo``) is the one reported.
+        """
+        compiled_patterns = []
+        seen = set()
+        for pattern, risk_info in self.risk_database.items():
+            canonical = pattern.strip()
+            if canonical in seen:
+                log.warning(f"Duplicate regex pattern in risk_database.json ignored: '{pattern}'")
+                continue
+            seen.add(canonical)
+            try:
+                compiled_patterns.append((canonical, re.compile(canonical), risk_info))
+            except re.error as e:
+                log.warning(f"Invalid regex pattern in risk_database.json: '{pattern}'. Error: {e}")
+        compiled_patterns.sort(key=lambda entry: -_literal_prefix_length(entry[0]))
+        return compiled_patterns
+
+    def _build_literal_automaton(self) -> Tuple[Optional[Any], set]:
+        """
+        Feeds plain-literal patterns (optionally anchored with ``^``) into an Aho-Corasick
+        automaton so they are all found in one linear pass over the command.
+        Returns the automaton (or None when pyahocorasick is unavailable) and the
+        indices it covers; everything else stays on the regex path.
+        """
+        if ahocorasick is None:
+            return None, set()
+
+        automaton = ahocorasick.Automaton()
+        literal_indices = set()
+        for i, (pattern, _, _) in enumerate(self.compiled_patterns):
+            anchored = pattern.startswith('^')
+            literal = pattern[1:] if anchored else pattern
+            if not literal or _REGEX_METACHARS.intersection(literal):
+                continue
+            entries = automaton.get(literal, [])
+            entries.append((i, anchored, len(literal)))
+            automaton.add_word(literal, entries)
+            literal_indices.add(i)
+
+        if not literal_indices:
+            return None, set()
+        automaton.make_automaton()
+        log.info(f"Aho-Corasick automaton built for {len(literal_indices)} literal risk patterns.")
+        return automaton, literal_indices
+
+    def _build_static_triggers(self) -> Optional[Tuple[str, ...]]:
+        """
+        Collects literal substrings at least one of which appears in any command that can
+        match the database (``rm -rf ``, ``sudo``, ``mkfs`` ...). Commands containing none
+        of them skip matching entirely. Returns None, disabling the prefilter, if some
+        pattern has no provable literal (or uses inline flags such as ``(?i)``).
+        """
+        triggers = set()
+        for pattern, _, _ in self.compiled_patterns:
+            if '(?' in pattern:
+                return None
+            for branch in _split_top_level_alternatives(pattern):
+                literal = _required_literal(branch)
+                if not literal:
+                    log.info(f"Risk pattern '{pattern}' has no required literal; static prefilter disabled.")
+                    return None
+                triggers.add(literal)
+        # A trigger containing a shorter trigger is redundant: the shorter one already fires
+        minimal = [t for t in triggers if not any(other != t and other in t for other in triggers)]
+        return tuple(sorted(minimal, key=len))
+
+    def _build_regex_set(self) -> Optional[Any]:
+        """
+        Compiles the regex patterns into an RE2 ``Set`` when google-re2 is installed.
+        A single automaton reports every matching pattern without backtracking; set
+        position ``n`` corresponds to ``self.regex_indices[n]``. Returns None when RE2
+        is unavailable or rejects a pattern, leaving the named-group union in charge.
+        """
+        if re2 is None or not self.regex_indices:
+            return None
         try:
-            with open(self.risk_database_path, 'r') as f:
-                log.info(f"Static risk database loaded from {self.risk_database_path}.")
-                return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError) as e:
-            log.error(f"Could not load or parse static risk database at {self.risk_database_path}: {e}. Static checks will be disabled.")
-            return {}
+            regex_set = re2.Set.SearchSet()
+            for i in self.regex_indices:
+                regex_set.Add(self.compiled_patterns[i][0])
+            regex_set.Compile()
+        except Exception as e:
+            log.warning(f"Could not build RE2 risk pattern set, using the Python regex union instead: {e}")
+            return None
+        log.info(f"RE2 pattern set built for {len(self.regex_indices)} regex risk patterns.")
+        return regex_set
+
+    def _build_combined_pattern(self) -> Tuple[Optional["re.Pattern[str]"], List[int]]:
+        """
+        Unions the regex patterns into one alternation of named groups so a command
+        is scanned once instead of once per pattern. The group name of the match
+        (``r<index>``) maps back to the originating database entry.
+
+        Only patterns that pass ``_is_unionable`` join the union; the rest are returned
+        as indices to check one by one, as are all patterns if the union fails to compile.
+        """
+        union_indices, standalone_indices = [], []
+        for i in self.regex_indices:
+            pattern, compiled, _ = self.compiled_patterns[i]
+            if _is_unionable(pattern, compiled):
+                union_indices.append(i)
+            else:
+                log.info(f"Risk pattern '{pattern}' is not anchored or has groups; it is checked on its own.")
+                standalone_indices.append(i)
+        if not union_indices:
+            return None, standalone_indices
+        combined = "|".join(f"(?P<r{i}>{self.compiled_patterns[i][0]})" for i in union_indices)
+        try:
+            return re.compile(combined), standalone_indices
+        except re.error as e:
+            log.warning(f"Could not build combined risk pattern, falling back to per-pattern checks: {e}")
+            return None, list(self.regex_indices)
 
     def _load_prompt_template(self) -> str:
         """Loads the prompt used for dynamic, LLM-based risk analysis."""
         try:
-            base_dir = os.path.dirname(__file__)
-            path = os.path.join(base_dir, "prompts", "risk_prompt.txt")
-            with open(path, 'r', encoding="utf-8") as f:
-                return f.read()
+            return _load_prompt_template_file(os.path.realpath(RISK_PROMPT_PATH))
         except FileNotFoundError:
             log.critical("FATAL: risk_prompt.txt not found. Dynamic risk analysis is impossible.")
             raise
 
+    def _match_static_index(self, command: str) -> Optional[int]:
+        """Returns the index of the first database entry matching the command, if any."""
+        if self.static_triggers is not None and not any(t in command for t in self.static_triggers):
+            return None
+
+        best = None
+
+        if self.literal_automaton is not None:
+            for end, entries in self.literal_automaton.iter(command):
+                for i, anchored, length in entries:
+                    if anchored and end - length + 1 != 0:
+                        continue
+                    if best is None or i < best:
+                        best = i
+
+        if self.regex_set is not None:
+            matched = self.regex_set.Match(command)
+            if matched:
+                i = self.regex_indices[min(matched)]
+                if best is None or i < best:
+                    best = i
+        else:
+            if self.combined_re is not None:
+                match = self.combined_re.search(command)
+                if match:
+                    i = int(match.lastgroup[1:])
+                    if best is None or i < best:
+                        best = i
+            for i in self.standalone_regex_indices:
+                if best is not None and i > best:
+                    break
+                if self.compiled_patterns[i][1].search(command):
+                    best = i
+                    break
+
+        return best
+
     def _check_static_database(self, command: str) -> Optional[str]:
-        """Layer 1: Checks the command against pre-defined regex patterns."""
-        for pattern, risk_info in self.risk_database.items():
-            try:
-                if re.search(pattern, command):
-                    log.info(f"Static risk match found for command '{command}' with pattern '{pattern}'.")
-                    return f"{risk_info.get('risk', 'UNKNOWN')}: {risk_info.get('explanation', 'No explanation provided.')}"
-            except re.error as e:
-                log.warning(f"Invalid regex pattern in risk_database.json: '{pattern}'. Error: {e}")
-        return None
+        """Layer 1: Checks the command against pre-defined regex and literal patterns."""
+        index = self._match_static_index(command)
+        if index is None:
+            return None
+        return self._format_static_match(command, index)
+
+    def _format_static_match(self, command: str, index: int) -> str:
+        """Formats the database entry at ``index`` as a 'LEVEL: explanation' string."""
+        pattern, risk_info = self.index_to_info[index]
+        log.info(f"Static risk match found for command '{command}' with pattern '{pattern}'.")
+        return f"{risk_info.get('risk', 'UNKNOWN')}: {risk_info.get('explanation', 'No explanation provided.')}"
+
+    def _is_decisive_static_match(self, command: str, index: Optional[int]) -> bool:
+        """
+        Decides whether a static verdict can stand on its own without the LLM layer.
+        CRITICAL and SAFE entries are decisive unless the entry sets ``"confident": false``;
+        a SAFE match additionally requires a plain command, since chaining or redirection
+        (``ls; rm -rf ~``) can make a safe prefix dangerous.
+        """
+        if self.force_ai_assessment or index is None:
+            return False
+        risk_info = self.index_to_info[index][1]
+        static_level = str(risk_info.get('risk', 'UNKNOWN')).upper()
+        if static_level not in DECISIVE_STATIC_LEVELS or not risk_info.get('confident', True):
+            return False
+        if static_level == 'SAFE' and not _SHELL_OPERATOR_CHARS.isdisjoint(command):
+            return False
+        return True
+
+    @staticmethod
+    def _make_cache_key(command: str, args: Optional[Dict[str, Any]]) -> str:
+        """Builds a stable cache key; ``None`` and ``{}`` args are kept apart since they prompt differently."""
+        if args is None:
+            return command
+        return command + "\0" + _serialize_args(args)
+
+    def _remember_assessment(self, cache_key: str, assessment: Dict[str, Any]) -> None:
+        """Stores an assessment in the LRU cache, evicting the least recently used entry when full."""
+        with self._assess_cache_lock:
+            self._assess_cache[cache_key] = dict(assessment)
+            self._assess_cache.move_to_end(cache_key)
+            if len(self._assess_cache) > ASSESS_CACHE_MAXSIZE:
+                self._assess_cache.popitem(last=False)
 
     def assess_risk(self, command: str, args: Optional[Dict[str, Any]] = None) -> Dict[str, str]:
         """
@@ -72,7 +659,11 @@ class RiskManager:
         
         Enhanced Flow:
         1. Check static risk database for known dangerous patterns (instant)
-        2. Use LLM for intelligent context-aware analysis (comprehensive)
+        2. Use LLM for intelligent context-aware analysis (comprehensive), unless the
+           database verdict is decisive (CRITICAL, or SAFE for a plain command).
+           Set LINA_FORCE_AI_RISK=1 to always run this layer, and/or LINA_OVERLAP_AI_RISK=1
+           to start it alongside step 1 (dropping it when step 1 is decisive; with both
+           flags set it is started early and always used).
         3. Combine both assessments for maximum safety
 
         Args:
@@ -83,128 +674,243 @@ class RiskManager:
             A dictionary with 'level', 'reason', 'explanation', 'database_match', and 'ai_analysis' keys.
         """
         if not command:
-            return {
-                'level': 'UNKNOWN',
-                'reason': 'No command provided for risk assessment.',
-                'explanation': 'No command provided for risk assessment.',
-                'database_match': None,
-                'ai_analysis': None
-            }
+            return self._empty_command_assessment()
+
+        cache_key = self._make_cache_key(command, args)
+        cached = self._get_cached_assessment(cache_key)
+        if cached is not None:
+            log.info(f"Risk assessment cache hit for: '{command}'")
+            return cached
+
+        # With LINA_OVERLAP_AI_RISK=1 the LLM call runs while Layer 1 is evaluated
+        ai_future = None
+        if self._ai_executor is not None:
+            ai_future = self._ai_executor.submit(self._run_ai_assessment, command, args)
 
         # === LAYER 1: STATIC DATABASE CHECK (FAST) ===
-        database_match = None
-        static_risk_level = None
-        static_risk_reason = None
-        
-        if not args:  # Only check database for raw shell commands
-            static_result = self._check_static_database(command)
-            if static_result:
-                database_match = static_result
-                if "SAFE" in static_result.upper():
-                    static_risk_level = 'SAFE'
-                    static_risk_reason = 'Command matched safe pattern in risk database'
-                else:
-                    static_risk_level = static_result.split(": ", 1)[0] if ": " in static_result else "UNKNOWN"
-                    static_risk_reason = static_result.split(": ", 1)[1] if ": " in static_result else static_result
-                
-                log.info(f"Database Match Found - Level: {static_risk_level}, Reason: {static_risk_reason}")
+        database_match, static_risk_level, static_risk_reason, static_index = self._static_assessment(command, args)
 
         # === LAYER 2: AI INTELLIGENT ANALYSIS (COMPREHENSIVE) ===
-        # Always perform AI analysis for comprehensive assessment
-        ai_analysis = None
-        ai_risk_level = None
-        ai_risk_reason = None
+        # Skipped when the static verdict is decisive on its own
+        if self._is_decisive_static_match(command, static_index):
+            log.info(f"Decisive static verdict ({static_risk_level}); skipping AI risk assessment")
+            if ai_future is not None:
+                ai_future.cancel()  # Best effort; a call already in flight is simply ignored
+            success, ai_analysis, ai_risk_level, ai_risk_reason = True, None, None, None
+        elif ai_future is not None:
+            success, ai_analysis, ai_risk_level, ai_risk_reason = ai_future.result()
+        else:
+            success, ai_analysis, ai_risk_level, ai_risk_reason = self._run_ai_assessment(command, args)
+
+        # === LAYER 3: COMBINED ASSESSMENT ===
+        assessment = self._finalize_assessment(
+            cache_key, success, database_match, static_risk_level, static_risk_reason,
+            ai_analysis, ai_risk_level, ai_risk_reason
+        )
         
-        if args is not None:
-            prompt_context = f"Assess the risk of running the tool '{command}' with the arguments: {json.dumps(args)}"
+        # Only LLM-backed verdicts are worth persisting; static ones are recomputed instantly
+        if success and ai_risk_level is not None:
+            self._persist_assessments([(cache_key, assessment)])
+        
+        return assessment
+
+    @staticmethod
+    def _empty_command_assessment() -> Dict[str, str]:
+        """Assessment returned when no command was provided."""
+        return {
+            'level': 'UNKNOWN',
+            'reason': 'No command provided for risk assessment.',
+            'explanation': 'No command provided for risk assessment.',
+            'database_match': None,
+            'ai_analysis': None
+        }
+
+    def _get_cached_assessment(self, cache_key: str) -> Optional[Dict[str, str]]:
+        """
+        Returns a copy of a cached assessment, checking the in-memory LRU first and the
+        persistent cache second, or None on a miss.
+        """
+        with self._assess_cache_lock:
+            cached = self._assess_cache.get(cache_key)
+            if cached is not None:
+                self._assess_cache.move_to_end(cache_key)
+                return dict(cached)
+        persisted = self._load_persisted_assessment(cache_key)
+        if persisted is not None:
+            self._remember_assessment(cache_key, persisted)
+        return persisted
+
+    def _static_assessment(self, command: str, args: Optional[Dict[str, Any]]) -> Tuple[Optional[str], Optional[str], Optional[str], Optional[int]]:
+        """
+        Layer 1: Looks the command up in the static database.
+
+        Returns:
+            Tuple of (database_match, static_risk_level, static_risk_reason, static_index).
+        """
+        if args:  # Only check database for raw shell commands
+            return None, None, None, None
+
+        static_index = self._match_static_index(command)
+        if static_index is None:
+            return None, None, None, None
+
+        static_result = self._format_static_match(command, static_index)
+        if "SAFE" in static_result.upper():
+            static_risk_level = 'SAFE'
+            static_risk_reason = 'Command matched safe pattern in risk database'
         else:
-            prompt_context = f"Assess the risk of running the Linux command: `{command}`"
+            static_risk_level = static_result.split(": ", 1)[0] if ": " in static_result else "UNKNOWN"
+            static_risk_reason = static_result.split(": ", 1)[1] if ": " in static_result else static_result
         
+        log.info(f"Database Match Found - Level: {static_risk_level}, Reason: {static_risk_reason}")
+        return static_result, static_risk_level, static_risk_reason, static_index
+
+    @staticmethod
+    def _build_prompt_context(command: str, args: Optional[Dict[str, Any]]) -> str:
+        """Describes the command (or tool invocation) for the LLM."""
+        if args is not None:
+            return f"Assess the risk of running the tool '{command}' with the arguments: {_serialize_args(args)}"
+        return f"Assess the risk of running the Linux command: `{command}`"
+
+    def _run_ai_assessment(self, command: str, args: Optional[Dict[str, Any]]) -> Tuple[bool, Optional[str], str, str]:
+        """
+        Layer 2: Asks the LLM to classify the command.
+
+        Returns:
+            Tuple of (success, ai_analysis, ai_risk_level, ai_risk_reason); success is False on API errors.
+        """
+        prompt_context = self._build_prompt_context(command, args)
         log.info(f"Performing AI risk assessment for: {prompt_context}")
         prompt = self.prompt_template.format(command=prompt_context)
         
-        success, response_or_error = self.llm_engine.generate_response(prompt)
+        response = self._stream_decisive_response(prompt)
+        if response is not None:
+            return (True, *self._parse_ai_response(response))
+        
+        success, response_or_error = self.llm_engine.generate_response(
+            prompt, max_tokens=AI_VERDICT_MAX_TOKENS, stop=AI_VERDICT_STOP_SEQUENCES
+        )
 
-        if success:
-            response = response_or_error
-            if "GENERATION_BLOCKED" in response:
-                ai_analysis = "AI safety filter blocked the assessment"
-                ai_risk_level = 'BLOCKED'
-                ai_risk_reason = 'AI safety filter blocked the risk assessment; treat as potentially risky.'
-            elif response.lower().startswith("risky:"):
-                ai_risk_reason = response[len("Risky:"):].strip()
-                ai_risk_level = 'RISKY'
-                ai_analysis = ai_risk_reason
-                log.warning(f"AI Risk Detected: {ai_risk_reason}")
-            elif response.lower().strip() == "safe":
-                ai_risk_level = 'SAFE'
-                ai_risk_reason = 'AI analysis confirms command is safe'
-                ai_analysis = 'Safe operation confirmed by AI analysis'
-                log.info(f"AI Assessment: Command is SAFE")
-            else:
-                ai_analysis = response
-                ai_risk_level = 'UNKNOWN'
-                ai_risk_reason = f'Unexpected AI response format'
-                log.warning(f"Unexpected AI response: '{response}'")
-        else:
+        if not success:
             log.error(f"AI risk assessment failed: {response_or_error}")
-            ai_analysis = f"AI analysis failed: {response_or_error}"
+            return False, f"AI analysis failed: {response_or_error}", 'UNKNOWN', 'Risk assessment failed due to an API error'
+
+        return (True, *self._parse_ai_response(response_or_error))
+
+    def _stream_decisive_response(self, prompt: str) -> Optional[str]:
+        """
+        Streams the LLM verdict and stops as soon as its classifying prefix is known:
+        "Safe" followed by whitespace, "Risky:" up to the end of its first line, or
+        GENERATION_BLOCKED. The remaining explanation tokens are never waited for.
+
+        Returns:
+            The (possibly truncated) response text, or None when streaming is
+            unavailable or fails, in which case the caller uses the blocking path.
+        """
+        generate_stream = getattr(self.llm_engine, 'generate_response_stream', None)
+        if generate_stream is None:
+            return None
+
+        success, chunks_or_error = generate_stream(
+            prompt, max_tokens=AI_VERDICT_MAX_TOKENS, stop=AI_VERDICT_STOP_SEQUENCES
+        )
+        if not success:
+            return None
+
+        buffer = ""
+        try:
+            for chunk in chunks_or_error:
+                buffer += chunk
+                if "GENERATION_BLOCKED" in buffer:
+                    return buffer
+                head = buffer.lstrip()
+                lowered = head.lower()
+                if lowered.startswith("safe") and len(lowered) > 4 and lowered[4].isspace():
+                    return head[:4]
+                if lowered.startswith("risky:") and "\n" in head:
+                    return head.split("\n", 1)[0]
+        except Exception as e:
+            log.warning(f"Streaming AI risk assessment failed, retrying without streaming: {e}")
+            return None
+        finally:
+            # Abandon the rest of the generation once the verdict is known
+            close = getattr(chunks_or_error, 'close', None)
+            if close is not None:
+                close()
+
+        return buffer
+
+    def _parse_ai_response(self, response: str) -> Tuple[str, str, str]:
+        """
+        Classifies a "Safe" / "Risky: <reason>" LLM verdict.
+
+        Returns:
+            Tuple of (ai_analysis, ai_risk_level, ai_risk_reason).
+        """
+        stripped = response.strip()
+        lowered = stripped.lower()
+        if "generation_blocked" in lowered:
+            ai_analysis = "AI safety filter blocked the assessment"
+            ai_risk_level = 'BLOCKED'
+            ai_risk_reason = 'AI safety filter blocked the risk assessment; treat as potentially risky.'
+        elif lowered.startswith("risky:"):
+            ai_risk_reason = stripped[_RISKY_PREFIX_LEN:].strip()
+            ai_risk_level = 'RISKY'
+            ai_analysis = ai_risk_reason
+            log.warning(f"AI Risk Detected: {ai_risk_reason}")
+        elif lowered == "safe":
+            ai_risk_level = 'SAFE'
+            ai_risk_reason = 'AI analysis confirms command is safe'
+            ai_analysis = 'Safe operation confirmed by AI analysis'
+            log.info(f"AI Assessment: Command is SAFE")
+        else:
+            ai_analysis = response
             ai_risk_level = 'UNKNOWN'
-            ai_risk_reason = 'Risk assessment failed due to an API error'
+            ai_risk_reason = f'Unexpected AI response format'
+            log.warning(f"Unexpected AI response: '{response}'")
+        return ai_analysis, ai_risk_level, ai_risk_reason
 
-        # === LAYER 3: COMBINED ASSESSMENT ===
+    def _finalize_assessment(self, cache_key: str, success: bool, database_match: Optional[str],
+                             static_risk_level: Optional[str], static_risk_reason: Optional[str],
+                             ai_analysis: Optional[str], ai_risk_level: Optional[str],
+                             ai_risk_reason: Optional[str]) -> Dict[str, str]:
+        """Layer 3: Combines both layers into the final assessment and caches it when it succeeded."""
         # Combine both assessments with priority to highest risk
         final_level = self._determine_final_risk_level(static_risk_level, ai_risk_level)
         final_reason = self._combine_risk_reasons(static_risk_reason, ai_risk_reason, final_level)
         
         log.info(f"Final Risk Assessment - Level: {final_level}")
         
-        return {
+        assessment = {
             'level': final_level,
             'reason': final_reason,
             'explanation': final_reason,  # Add explanation field for compatibility
             'database_match': database_match,
             'ai_analysis': ai_analysis
         }
+        
+        # API failures are transient, so only successful assessments are remembered
+        if success:
+            self._remember_assessment(cache_key, assessment)
+        
+        return assessment
 
     def _determine_final_risk_level(self, static_level: Optional[str], ai_level: Optional[str]) -> str:
         """
         Determines the final risk level by combining static and AI assessments.
         Priority: CRITICAL > BLOCKED > RISKY > HIGH > MEDIUM > LOW > UNKNOWN > SAFE
         """
-        risk_priority = {
-            'CRITICAL': 7,
-            'BLOCKED': 6,
-            'RISKY': 5,
-            'HIGH': 4,
-            'MEDIUM': 3,
-            'LOW': 2,
-            'UNKNOWN': 1,
-            'SAFE': 0
-        }
-        
-        static_priority = risk_priority.get(static_level, -1) if static_level else -1
-        ai_priority = risk_priority.get(ai_level, -1) if ai_level else -1
-        
-        # Return the higher risk level
-        if static_priority >= ai_priority:
-            return static_level if static_level else 'UNKNOWN'
-        else:
-            return ai_level if ai_level else 'UNKNOWN'
+        return RISK_LABELS[max(RISK_PRIORITY.get(static_level, _UNKNOWN_PRIORITY),
+                               RISK_PRIORITY.get(ai_level, _UNKNOWN_PRIORITY))]
     
     def _combine_risk_reasons(self, static_reason: Optional[str], ai_reason: Optional[str], final_level: str) -> str:
         """
         Combines reasons from both assessment layers into a comprehensive explanation.
         """
-        reasons = []
-        
+        if static_reason and ai_reason:
+            return f"Database: {static_reason} | AI Analysis: {ai_reason}"
         if static_reason:
-            reasons.append(f"Database: {static_reason}")
-        
+            return f"Database: {static_reason}"
         if ai_reason:
-            reasons.append(f"AI Analysis: {ai_reason}")
-        
-        if not reasons:
-            return "No specific risk information available"
-        
-        return " | ".join(reasons)
\ No newline at end of file
+            return f"AI Analysis: {ai_reason}"
+        return "No specific risk information available"
\ No newline at end of file
@@ -7,13 +7,210 @@
 # awareness and provides a foundation for adaptive behavior.
 
 import os
+import atexit
 import sqlite3
 import json
+import queue
+import threading
+import weakref
+from collections import Counter, deque
+from contextlib import contextmanager
 from datetime import datetime
-from typing import List, Dict, Any, Optional, Tuple
+from itertools import groupby, islice
+from operator import itemgetter
+from time import localtime, strftime
+from typing import List, Dict, Any, Optional, Tuple, Deque
 
 from utils.logger import log
 
+try:
+    import orjson  # Optional: faster JSON for preferences and session metadata
+except ImportError:
+    orjson = None
+
+
+# Stored in the database's PRAGMA user_version once the schema below has been
+# applied; bump it whenever tables, columns or indexes change
+SCHEMA_VERSION = 2
+
+# Columns added to the history table after its first release, applied in order
+# to older databases as (column name, column definition)
+HISTORY_COLUMN_MIGRATIONS = (
+    ('session_id', "TEXT DEFAULT 'legacy_session'"),
+    ('tool_name', 'TEXT'),
+    ('execution_time_ms', 'INTEGER'),
+    ('success', 'BOOLEAN'),
+    ('tool_id', 'INTEGER REFERENCES tools(id)'),
+)
+
+# Statements on the interaction path, kept byte-identical so sqlite3's
+# per-connection statement cache reuses the compiled form
+_SQL_INSERT_SESSION = (
+    "INSERT INTO sessions (session_id, start_time, ai_engine, ai_mode, expert_role, session_metadata) "
+    "VALUES (?, ?, ?, ?, ?, ?)"
+)
+_SQL_END_SESSION = (
+    "UPDATE sessions SET end_time = ?, total_commands = ?, total_tools_used = ?, total_conversations = ? "
+    "WHERE session_id = ?"
+)
+_SQL_REGISTER_TOOL = "INSERT INTO tools (name) VALUES (?) ON CONFLICT(name) DO NOTHING"
+_SQL_ALL_TOOLS = "SELECT name FROM tools"
+# Tool names are stored as a tools.id reference; history_v resolves them back for readers
+_SQL_INSERT_HISTORY = (
+    "INSERT INTO history (session_id, timestamp, user_input, executed_action, action_type, "
+    "tool_id, output, risk_assessment, execution_time_ms, success) "
+    "VALUES (?, ?, ?, ?, ?, (SELECT id FROM tools WHERE name = ?), ?, ?, ?, ?)"
+)
+_SQL_RECENT_HISTORY = (
+    "SELECT timestamp, user_input, executed_action, action_type, tool_name "
+    "FROM history_v WHERE session_id = ? ORDER BY id DESC LIMIT ?"
+)
+_SQL_SESSION_ACTIVITY = (
+    "SELECT action_type, tool_name, COUNT(*) AS count, SUM(CASE WHEN success = 0 THEN 1 ELSE 0 END) AS failures "
+    "FROM history_v WHERE session_id = ? GROUP BY action_type, tool_name"
+)
+_SQL_SET_PREFERENCE = (
+    "INSERT INTO user_preferences (key, value, last_updated) VALUES (?, ?, ?) "
+    "ON CONFLICT(key) DO UPDATE SET value = excluded.value, last_updated = excluded.last_updated"
+)
+_SQL_GET_PREFERENCE = "SELECT value FROM user_preferences WHERE key = ?"
+_SQL_ALL_PREFERENCES = "SELECT key, value FROM user_preferences"
+
+# Secondary indexes on the history table as (index name, column list)
+HISTORY_INDEXES = (
+    ('idx_history_session_id', '(session_id, id DESC)'),
+    ('idx_history_action_type', '(action_type)'),
+)
+
+# Session counter incremented for each action type ('tool' is tracked separately as a set)
+ACTION_STAT_KEYS = {
+    'command': 'commands_executed',
+    'conversation': 'conversations',
+    'explanation': 'explanations_requested',
+    'plan': 'plans_generated',
+    'plan_execution': 'plans_executed',
+    'risk_assessment': 'risk_assessments',
+}
+
+# Format of history and session timestamps (local time, second resolution)
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def _now_timestamp() -> str:
+    """Formats the current local time without building a datetime object."""
+    return strftime(TIMESTAMP_FORMAT, localtime())
+
+
+def _json_dumps(obj: Any) -> str:
+    """Serializes to a JSON string with orjson when available, falling back to the json module."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+    return json.dumps(obj)
+
+
+def _json_loads(data: str) -> Any:
+    """Parses JSON with orjson when available, falling back to the json module."""
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+# Queued to tell the background writer to exit, or to checkpoint the WAL now
+_WRITER_STOP = object()
+_WRITER_CHECKPOINT = object()
+
+
+def _checkpoint_wal(conn: sqlite3.Connection):
+    """Copies the WAL back into the database and truncates it to zero bytes."""
+    try:
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+    except sqlite3.Error as e:
+        log.warning(f"Session database WAL checkpoint failed: {e}")
+
+
+def _session_writer_loop(write_queue: "queue.Queue", db_path: str, batch_size: int,
+                         checkpoint_interval: int):
+    """
+    Body of the background writer thread: commits queued (sql, params) writes.
+    
+    Each pass blocks for one write, drains whatever else is already queued (up
+    to batch_size) and commits it all in one transaction, so bursts share a
+    commit while a lone write is still committed immediately. The thread owns
+    its own connection and does not reference the SessionManager, so an
+    unclosed manager can still be garbage-collected.
+    
+    On top of SQLite's automatic checkpoints, the writer truncates the WAL every
+    checkpoint_interval writes, on request and on exit, so the file shrinks back
+    instead of staying at its high-water mark.
+    
+    Args:
+        write_queue: Queue of (sql, params) tuples, _WRITER_CHECKPOINT requests
+            and a final _WRITER_STOP
+        db_path: Path to the session database
+        batch_size: Maximum number of writes committed per transaction
+        checkpoint_interval: Number of writes between WAL checkpoints
+    """
+    try:
+        conn = SessionManager._open_connection(db_path)
+    except Exception as e:
+        # Callers notice the dead writer and commit their writes themselves
+        log.error(f"Background session writer could not open {db_path}: {e}")
+        return
+    writes_since_checkpoint = 0
+    stopping = False
+    
+    while not stopping:
+        batch = [write_queue.get()]
+        try:
+            while len(batch) < batch_size:
+                try:
+                    batch.append(write_queue.get_nowait())
+                except queue.Empty:
+                    break
+            
+            writes = [item for item in batch if isinstance(item, tuple)]
+            stopping = any(item is _WRITER_STOP for item in batch)
+            checkpoint_requested = any(item is _WRITER_CHECKPOINT for item in batch)
+            
+            if writes:
+                try:
+                    _commit_writes(conn, writes)
+                except Exception as e:
+                    log.error(f"Background session writer failed to commit {len(writes)} write(s): {e}")
+            
+            writes_since_checkpoint += len(writes)
+            if checkpoint_requested or stopping or writes_since_checkpoint >= checkpoint_interval:
+                _checkpoint_wal(conn)
+                writes_since_checkpoint = 0
+        except Exception as e:
+            log.error(f"Background session writer error: {e}")
+        finally:
+            # Always settle the batch so flush() never waits on writes that were dropped
+            for _ in batch:
+                write_queue.task_done()
+    
+    conn.close()
+
+
+def _commit_writes(conn: sqlite3.Connection, writes: List[Tuple[str, Tuple]]):
+    """Commits (sql, params) writes in one transaction, rolling back on any error."""
+    with conn:
+        # Consecutive writes of the same statement go through one executemany
+        for sql, group in groupby(writes, key=itemgetter(0)):
+            conn.executemany(sql, [params for _, params in group])
+
+
+# Managers with an open connection, closed together at interpreter exit. A WeakSet
+# keeps this registration from holding managers alive for the life of the process.
+_open_managers: "weakref.WeakSet[SessionManager]" = weakref.WeakSet()
+
+
+def _close_open_managers():
+    """Closes every SessionManager that was not closed explicitly."""
+    for manager in list(_open_managers):
+        manager.close()
+
+
+atexit.register(_close_open_managers)
+
 
 class SessionManager:
     """
@@ -29,15 +226,43 @@ class SessionManager:
     intelligent session management system.
     """
     
+    # Most queued writes the background writer commits in one transaction
+    WRITE_BATCH_SIZE = 32
+    
+    # Writes between WAL checkpoints run by the background writer
+    WAL_CHECKPOINT_INTERVAL = 500
+    
+    # Seconds flush() waits between checks that the background writer is still alive
+    WRITER_LIVENESS_INTERVAL = 0.5
+    
+    # Command output longer than this is written to data/logs/<session_id>/ and
+    # only its head is kept in the history row
+    MAX_INLINE_OUTPUT = 4096
+    
     def __init__(self):
         """
         Initializes the SessionManager with database connection and session state.
         """
-        # Database setup
+        # History and preference writes are committed off the caller's thread by a
+        # background writer; inside batched() they are held back until the block exits
+        self._write_queue: "queue.Queue" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._pending_writes: List[Tuple[str, Tuple]] = []
+        self._pending_lock = threading.Lock()
+        self._batch_depth = 0
+        self._spilled_outputs = 0
+        
+        # Database setup. self.conn is the shared connection used for schema setup
+        # (and by the creating thread); other threads get their own via _conn().
         self.db_path = self._setup_database_path()
         self.conn: Optional[sqlite3.Connection] = None
+        self._local = threading.local()
+        self._thread_conns: List[sqlite3.Connection] = []
+        self._conns_lock = threading.Lock()
         self._connect_database()
+        _open_managers.add(self)
         self._setup_database_schema()
+        self._start_writer()
         
         # Session state tracking
         self.session_id = self._generate_session_id()
@@ -52,11 +277,16 @@ class SessionManager:
             'risk_assessments': 0,
             'errors_encountered': 0
         }
+        # History rows recorded by this session, queued writes included
+        self._interactions_recorded = 0
         
         # Context management
-        self.conversation_history: List[Dict[str, str]] = []
-        self.recent_actions: List[Dict[str, Any]] = []
+        # Bounded deque drops the oldest turn on append (last 20 turns); recent
+        # actions are read back from the history table via get_recent_history()
+        self.conversation_history: Deque[Dict[str, str]] = deque(maxlen=20)
         self.user_preferences: Dict[str, Any] = {}
+        self._load_preferences()
+        self._known_tools = self._load_tool_names()
         
         log.info(f"SessionManager initialized for session {self.session_id}")
     
@@ -81,12 +311,84 @@ class SessionManager:
         Raises:
             sqlite3.Error: If database connection fails
         """
+        # Remembered so schema setup can skip introspection on a brand-new file
+        self._db_existed = os.path.exists(self.db_path)
+        
         try:
-            self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self.conn = self._open_connection(self.db_path)
             log.info(f"Connected to session database at {self.db_path}")
         except sqlite3.Error as e:
             log.critical(f"FATAL: Could not connect to database at {self.db_path}: {e}")
             raise
+        
+        self._local.conn = self.conn
+        self._thread_conns.append(self.conn)
+    
+    @staticmethod
+    def _open_connection(db_path: str) -> sqlite3.Connection:
+        """
+        Opens and configures a new connection to the session database.
+        
+        check_same_thread is disabled only so close() can shut down connections
+        from whichever thread exits last; each connection is otherwise used by
+        the single thread that opened it.
+        
+        Args:
+            db_path: Path to the SQLite database file
+        
+        Returns:
+            Configured SQLite connection
+        """
+        conn = sqlite3.connect(db_path, check_same_thread=False, cached_statements=256)
+        conn.row_factory = sqlite3.Row
+        SessionManager._configure_connection(conn)
+        return conn
+    
+    def _conn(self) -> sqlite3.Connection:
+        """
+        Returns the calling thread's connection, opening it on first use.
+        
+        SQLite connections must not be shared between threads, so each thread
+        gets its own; WAL mode and busy_timeout let SQLite serialize their writes.
+        
+        Returns:
+            SQLite connection owned by the current thread
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._open_connection(self.db_path)
+            self._local.conn = conn
+            with self._conns_lock:
+                self._thread_conns.append(conn)
+        return conn
+    
+    @staticmethod
+    def _configure_connection(conn: sqlite3.Connection):
+        """
+        Applies WAL journaling and write-friendly PRAGMAs to a connection.
+        
+        WAL lets readers proceed during writes and, with synchronous=NORMAL,
+        avoids an fsync of the main database on every commit. Some filesystems
+        (e.g. network mounts) refuse WAL, so failures here are logged and the
+        connection keeps SQLite's defaults.
+        
+        Args:
+            conn: The SQLite connection to configure
+        """
+        try:
+            journal_mode = conn.execute("PRAGMA journal_mode=WAL").fetchone()[0]
+            if journal_mode.lower() != 'wal':
+                log.warning(f"Session database journal mode is '{journal_mode}', WAL not available")
+            else:
+                log.info("Session database using WAL journal mode")
+        
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA temp_store=MEMORY")
+            conn.execute("PRAGMA mmap_size=268435456")
+            conn.execute("PRAGMA cache_size=-65536")
+            conn.execute("PRAGMA busy_timeout=3000")
+        except sqlite3.Error as e:
+            log.warning(f"Could not apply session database PRAGMAs: {e}")
     
     def _setup_database_schema(self):
         """
@@ -100,11 +402,25 @@ class SessionManager:
         try:
             cursor = self.conn.cursor()
             
-            # Check if history table exists and get its schema
-            cursor.execute("PRAGMA table_info(history)")
-            existing_columns = [column[1] for column in cursor.fetchall()]
+            # Databases already at the current schema version need no checks at all
+            cursor.execute("PRAGMA user_version")
+            if cursor.fetchone()[0] == SCHEMA_VERSION:
+                log.info("Database schema verified and ready")
+                return
+            
+            # All DDL runs in one transaction so a partial migration never persists
+            cursor.execute("BEGIN IMMEDIATE")
+            
+            # Tool vocabulary, referenced by history.tool_id to keep history rows narrow
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS tools (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL UNIQUE
+            )
+            """)
             
             # Main history table - create if doesn't exist
+            # (tool_name is legacy; new rows leave it NULL and set tool_id instead)
             cursor.execute("""
             CREATE TABLE IF NOT EXISTS history (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -117,49 +433,58 @@ class SessionManager:
                 output TEXT,
                 risk_assessment TEXT,
                 execution_time_ms INTEGER,
-                success BOOLEAN
+                success BOOLEAN,
+                tool_id INTEGER REFERENCES tools(id)
             )
             """)
             
-            # --- UPDATE: Enhanced schema migration logic for multiple columns ---
-            migration_performed = False
-            
             # CRITICAL: Schema migration for existing databases
-            # If the table exists but doesn't have session_id column, add it
-            if existing_columns and 'session_id' not in existing_columns:
-                log.info("Migrating database schema: Adding session_id column to history table")
-                cursor.execute("ALTER TABLE history ADD COLUMN session_id TEXT DEFAULT 'legacy_session'")
-                migration_performed = True
-                log.info("Added session_id column to history table")
+            # A database file created by this process already has every column and
+            # index, so the introspection below is skipped for it
+            needs_analyze = False
+            existing_indexes = set()
+            if self._db_existed:
+                cursor.execute("PRAGMA table_info(history)")
+                existing_columns = {column[1] for column in cursor.fetchall()}
+                for column_name, column_definition in HISTORY_COLUMN_MIGRATIONS:
+                    if column_name not in existing_columns:
+                        log.info(f"Migrating database schema: Adding {column_name} column to history table")
+                        cursor.execute(f"ALTER TABLE history ADD COLUMN {column_name} {column_definition}")
+                        needs_analyze = True
+                
+                # Move inline tool names into the tools table
+                cursor.execute("""
+                INSERT INTO tools (name)
+                SELECT DISTINCT tool_name FROM history WHERE tool_name IS NOT NULL
+                ON CONFLICT(name) DO NOTHING
+                """)
+                cursor.execute("""
+                UPDATE history
+                SET tool_id = (SELECT id FROM tools WHERE tools.name = history.tool_name), tool_name = NULL
+                WHERE tool_name IS NOT NULL
+                """)
+                if cursor.rowcount > 0:
+                    log.info(f"Migrating database schema: Moved {cursor.rowcount} tool name(s) into the tools table")
+                    needs_analyze = True
+                
+                cursor.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'history'")
+                existing_indexes = {row[0] for row in cursor.fetchall()}
             
-            # --- UPDATE: Add tool_name column migration ---
-            # If the table exists but doesn't have tool_name column, add it
-            if existing_columns and 'tool_name' not in existing_columns:
-                log.info("Migrating database schema: Adding tool_name column to history table")
-                cursor.execute("ALTER TABLE history ADD COLUMN tool_name TEXT")
-                migration_performed = True
-                log.info("Added tool_name column to history table")
-
-            # --- UPDATE: Add execution_time_ms column migration ---
-            # If the table exists but doesn't have execution_time_ms column, add it
-            if existing_columns and 'execution_time_ms' not in existing_columns:
-                log.info("Migrating database schema: Adding execution_time_ms column to history table")
-                cursor.execute("ALTER TABLE history ADD COLUMN execution_time_ms INTEGER")
-                migration_performed = True
-                log.info("Added execution_time_ms column to history table")
-
-            # --- UPDATE: Add success column migration ---
-            # If the table exists but doesn't have success column, add it
-            if existing_columns and 'success' not in existing_columns:
-                log.info("Migrating database schema: Adding success column to history table")
-                cursor.execute("ALTER TABLE history ADD COLUMN success BOOLEAN")
-                migration_performed = True
-                log.info("Added success column to history table")
+            # Indexes for per-session history lookups (newest first) and per-type analytics.
+            # Created after the migrations because they reference migrated columns.
+            for index_name, index_definition in HISTORY_INDEXES:
+                if index_name not in existing_indexes:
+                    cursor.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON history{index_definition}")
+                    needs_analyze = needs_analyze or self._db_existed
             
-            # Commit all migrations at once
-            if migration_performed:
-                self.conn.commit()
-                log.info("Database schema migration completed successfully")
+            # Read-side view with tool names resolved, for code that expects history.tool_name
+            cursor.execute("""
+            CREATE VIEW IF NOT EXISTS history_v AS
+            SELECT h.id, h.session_id, h.timestamp, h.user_input, h.executed_action, h.action_type,
+                   COALESCE(t.name, h.tool_name) AS tool_name, h.output, h.risk_assessment,
+                   h.execution_time_ms, h.success
+            FROM history h LEFT JOIN tools t ON t.id = h.tool_id
+            """)
             
             # Session metadata table
             cursor.execute("""
@@ -186,12 +511,31 @@ class SessionManager:
             )
             """)
             
+            # Refresh planner statistics once so the new indexes are picked up
+            if needs_analyze:
+                cursor.execute("ANALYZE")
+            
+            # PRAGMA does not accept bound parameters; SCHEMA_VERSION is a module constant
+            cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            
             self.conn.commit()
             log.info("Database schema verified and ready")
             
         except sqlite3.Error as e:
+            if self.conn.in_transaction:
+                self.conn.rollback()
             log.error(f"Failed to setup database schema: {e}")
     
+    def _start_writer(self):
+        """Starts the background thread that commits queued history and preference writes."""
+        self._writer = threading.Thread(
+            target=_session_writer_loop,
+            args=(self._write_queue, self.db_path, self.WRITE_BATCH_SIZE, self.WAL_CHECKPOINT_INTERVAL),
+            name="lina-session-writer",
+            daemon=True
+        )
+        self._writer.start()
+    
     def _generate_session_id(self) -> str:
         """
         Generates a unique session identifier.
@@ -220,19 +564,16 @@ class SessionManager:
             return
         
         try:
-            cursor = self.conn.cursor()
-            cursor.execute("""
-            INSERT INTO sessions (session_id, start_time, ai_engine, ai_mode, expert_role, session_metadata)
-            VALUES (?, ?, ?, ?, ?, ?)
-            """, (
+            conn = self._conn()
+            conn.execute(_SQL_INSERT_SESSION, (
                 self.session_id,
-                self.session_start_time.strftime("%Y-%m-%d %H:%M:%S"),
+                self.session_start_time.strftime(TIMESTAMP_FORMAT),
                 ai_engine,
                 ai_mode,
                 expert_role,
-                json.dumps(metadata or {})
+                _json_dumps(metadata or {})
             ))
-            self.conn.commit()
+            conn.commit()
             log.info(f"Session {self.session_id} started with {ai_engine}/{ai_mode}/{expert_role}")
             
         except sqlite3.Error as e:
@@ -246,25 +587,23 @@ class SessionManager:
             log.error("Cannot end session: No database connection")
             return
         
+        self.flush()
+        
         try:
-            cursor = self.conn.cursor()
-            cursor.execute("""
-            UPDATE sessions SET 
-                end_time = ?,
-                total_commands = ?,
-                total_tools_used = ?,
-                total_conversations = ?
-            WHERE session_id = ?
-            """, (
-                datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            conn = self._conn()
+            conn.execute(_SQL_END_SESSION, (
+                _now_timestamp(),
                 self.session_stats['commands_executed'],
                 len(self.session_stats['tools_used']),
                 self.session_stats['conversations'],
                 self.session_id
             ))
-            self.conn.commit()
+            conn.commit()
             log.info(f"Session {self.session_id} ended successfully")
             
+            # Let the writer fold the session's WAL back into the database
+            self._write_queue.put(_WRITER_CHECKPOINT)
+            
         except sqlite3.Error as e:
             log.error(f"Failed to end session: {e}")
     
@@ -292,41 +631,150 @@ class SessionManager:
             log.error("Cannot add interaction: No database connection")
             return
         
-        try:
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            cursor = self.conn.cursor()
-            cursor.execute("""
-            INSERT INTO history (session_id, timestamp, user_input, executed_action, 
-                               action_type, tool_name, output, risk_assessment, 
-                               execution_time_ms, success)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                self.session_id, timestamp, user_input, executed_action,
-                action_type, tool_name, output, risk_assessment,
-                execution_time_ms, success
-            ))
-            self.conn.commit()
-            
-            # Update session statistics
-            self._update_session_stats(action_type, tool_name, success)
-            
-            # Add to recent actions for context
-            self.recent_actions.append({
-                'timestamp': timestamp,
-                'user_input': user_input,
-                'action': executed_action,
-                'type': action_type,
-                'tool': tool_name,
-                'success': success
-            })
-            
-            # Keep only recent actions (last 10)
-            self.recent_actions = self.recent_actions[-10:]
-            
-            log.info(f"Interaction recorded: {action_type} - {executed_action}")
+        timestamp = _now_timestamp()
+        
+        # Keep history rows compact: large outputs live in a side file
+        if output and len(output) > self.MAX_INLINE_OUTPUT:
+            spill_path = self._spill_output(output)
+            if spill_path:
+                output = f"{output[:self.MAX_INLINE_OUTPUT]}\n...<truncated; full output at {spill_path}>"
+        
+        # New tool names are registered first; the history insert looks up their id
+        if tool_name and tool_name not in self._known_tools:
+            self._known_tools.add(tool_name)
+            self._queue_write(_SQL_REGISTER_TOOL, (tool_name,))
+        
+        # Hand the row to the background writer; the caller never waits on SQLite
+        self._queue_write(_SQL_INSERT_HISTORY, (
+            self.session_id, timestamp, user_input, executed_action,
+            action_type, tool_name, output, risk_assessment,
+            execution_time_ms, success
+        ))
+        
+        # Update session statistics
+        self._interactions_recorded += 1
+        self._update_session_stats(action_type, tool_name, success)
+        
+        log.info(f"Interaction recorded: {action_type} - {executed_action}")
+    
+    def _spill_output(self, output: str) -> Optional[str]:
+        """
+        Writes a large command output to a per-session file under data/logs.
+        
+        Args:
+            output: The full output text
             
-        except sqlite3.Error as e:
-            log.error(f"Failed to record interaction: {e}")
+        Returns:
+            Path of the written file, or None if it could not be written
+        """
+        data_dir = os.path.dirname(os.path.dirname(self.db_path))
+        spill_dir = os.path.join(data_dir, 'logs', self.session_id)
+        self._spilled_outputs += 1
+        spill_path = os.path.join(spill_dir, f"output_{self._spilled_outputs:05d}.txt")
+        
+        try:
+            os.makedirs(spill_dir, exist_ok=True)
+            with open(spill_path, 'w', encoding='utf-8', errors='replace') as f:
+                f.write(output)
+            return spill_path
+        except OSError as e:
+            log.error(f"Failed to save full command output to {spill_path}: {e}")
+            return None
+    
+    def _queue_write(self, sql: str, params: Tuple):
+        """
+        Queues a write for the background writer, or holds it while inside batched().
+        
+        Args:
+            sql: One of the module-level write statements
+            params: Statement parameters
+        """
+        if self._batch_depth:
+            with self._pending_lock:
+                self._pending_writes.append((sql, params))
+        else:
+            self._write_queue.put((sql, params))
+            if not self._writer_alive():
+                self._drain_writes_sync()
+    
+    def _release_pending_writes(self):
+        """Moves writes held by batched() onto the writer queue, preserving their order."""
+        with self._pending_lock:
+            pending, self._pending_writes = self._pending_writes, []
+        for write in pending:
+            self._write_queue.put(write)
+        if pending and not self._writer_alive():
+            self._drain_writes_sync()
+    
+    def _writer_alive(self) -> bool:
+        """Whether the background writer thread is still running."""
+        return self._writer is not None and self._writer.is_alive()
+    
+    def _drain_writes_sync(self):
+        """
+        Commits queued writes on the calling thread.
+        
+        Fallback for when the background writer has died (or never started), so
+        writes are not silently left in the queue.
+        """
+        drained = []
+        while True:
+            try:
+                drained.append(self._write_queue.get_nowait())
+            except queue.Empty:
+                break
+        if not drained:
+            return
+        
+        writes = [item for item in drained if isinstance(item, tuple)]
+        try:
+            if writes:
+                log.warning(f"Session writer is not running; committing {len(writes)} write(s) synchronously")
+                _commit_writes(self._conn(), writes)
+        except Exception as e:
+            log.error(f"Failed to commit {len(writes)} session write(s): {e}")
+        finally:
+            for _ in drained:
+                self._write_queue.task_done()
+    
+    def flush(self):
+        """
+        Blocks until every queued interaction and preference has been committed.
+        
+        Called automatically before history is read and when the session ends,
+        so reads through this manager always see its own writes.
+        """
+        if not self.conn:
+            return
+        
+        self._release_pending_writes()
+        
+        # Like Queue.join(), but re-checks the writer so a thread that died with
+        # writes outstanding cannot block this forever
+        write_queue = self._write_queue
+        with write_queue.all_tasks_done:
+            while write_queue.unfinished_tasks and self._writer_alive():
+                write_queue.all_tasks_done.wait(self.WRITER_LIVENESS_INTERVAL)
+        if not self._writer_alive():
+            self._drain_writes_sync()
+    
+    @contextmanager
+    def batched(self):
+        """
+        Holds all database writes until the block exits, then commits them together.
+        
+        Usage:
+            with session_manager.batched():
+                session_manager.add_interaction(...)
+                session_manager.set_preference(...)
+        """
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if not self._batch_depth:
+                self._release_pending_writes()
     
     def _update_session_stats(self, action_type: str, tool_name: str = None, success: bool = True):
         """
@@ -337,25 +785,16 @@ class SessionManager:
             tool_name: Name of tool used (if applicable)
             success: Whether the action succeeded
         """
-        if action_type == 'command':
-            self.session_stats['commands_executed'] += 1
+        stat_key = ACTION_STAT_KEYS.get(action_type)
+        if stat_key:
+            self.session_stats[stat_key] += 1
         elif action_type == 'tool' and tool_name:
             self.session_stats['tools_used'].add(tool_name)
-        elif action_type == 'conversation':
-            self.session_stats['conversations'] += 1
-        elif action_type == 'explanation':
-            self.session_stats['explanations_requested'] += 1
-        elif action_type == 'plan':
-            self.session_stats['plans_generated'] += 1
-        elif action_type == 'plan_execution':
-            self.session_stats['plans_executed'] += 1
-        elif action_type == 'risk_assessment':
-            self.session_stats['risk_assessments'] += 1
         
         if not success:
             self.session_stats['errors_encountered'] += 1
     
-    def get_recent_history(self, limit: int = 5) -> List[Tuple]:
+    def get_recent_history(self, limit: int = 5) -> List[sqlite3.Row]:
         """
         Retrieves recent interaction history for context awareness.
         
@@ -363,23 +802,18 @@ class SessionManager:
             limit: Maximum number of recent entries to retrieve
             
         Returns:
-            List of tuples containing recent interaction data
+            List of sqlite3.Row objects (timestamp, user_input, executed_action,
+            action_type, tool_name), indexable by position or column name
         """
         if not self.conn:
             log.error("Cannot get history: No database connection")
             return []
         
+        # Make buffered interactions visible to the query
+        self.flush()
+        
         try:
-            cursor = self.conn.cursor()
-            cursor.execute("""
-            SELECT timestamp, user_input, executed_action, action_type, tool_name 
-            FROM history 
-            WHERE session_id = ? 
-            ORDER BY id DESC 
-            LIMIT ?
-            """, (self.session_id, limit))
-            
-            return cursor.fetchall()
+            return self._conn().execute(_SQL_RECENT_HISTORY, (self.session_id, limit)).fetchall()
             
         except sqlite3.Error as e:
             log.error(f"Failed to retrieve history: {e}")
@@ -402,9 +836,6 @@ class SessionManager:
             'content': content,
             'timestamp': datetime.now().isoformat()
         })
-        
-        # Keep conversation history manageable (last 20 turns)
-        self.conversation_history = self.conversation_history[-20:]
     
     def get_conversation_context(self, max_turns: int = 10) -> List[Dict[str, str]]:
         """
@@ -416,7 +847,8 @@ class SessionManager:
         Returns:
             List of conversation turns
         """
-        return self.conversation_history[-max_turns:]
+        start = max(0, len(self.conversation_history) - max_turns)
+        return list(islice(self.conversation_history, start, None))
     
     def clear_conversation_context(self):
         """Clears the current conversation context."""
@@ -439,20 +871,49 @@ class SessionManager:
             log.error("Cannot set preference: No database connection")
             return
         
+        self._queue_write(_SQL_SET_PREFERENCE, (key, _json_dumps(value), datetime.now().isoformat()))
+        
+        # Update local cache
+        self.user_preferences[key] = value
+        log.info(f"Preference set: {key} = {value}")
+    
+    def _load_preferences(self):
+        """
+        Loads every stored preference into the local cache with a single query.
+        
+        The preferences table is small, so preloading it means get_preference
+        is a dict lookup for any key that exists at startup.
+        """
+        if not self.conn:
+            return
+        
         try:
-            cursor = self.conn.cursor()
-            cursor.execute("""
-            INSERT OR REPLACE INTO user_preferences (key, value, last_updated)
-            VALUES (?, ?, ?)
-            """, (key, json.dumps(value), datetime.now().isoformat()))
-            self.conn.commit()
-            
-            # Update local cache
-            self.user_preferences[key] = value
-            log.info(f"Preference set: {key} = {value}")
+            for key, value in self._conn().execute(_SQL_ALL_PREFERENCES):
+                try:
+                    self.user_preferences[key] = _json_loads(value)
+                except json.JSONDecodeError as e:
+                    log.error(f"Ignoring unreadable preference {key}: {e}")
+            log.info(f"Loaded {len(self.user_preferences)} user preference(s)")
             
         except sqlite3.Error as e:
-            log.error(f"Failed to set preference: {e}")
+            log.error(f"Failed to load preferences: {e}")
+    
+    def _load_tool_names(self) -> set:
+        """
+        Loads the names already in the tools table, so add_interaction only
+        registers tools it has not seen before.
+        
+        Returns:
+            Set of known tool names (empty if the database is unavailable)
+        """
+        if not self.conn:
+            return set()
+        
+        try:
+            return {row['name'] for row in self._conn().execute(_SQL_ALL_TOOLS)}
+        except sqlite3.Error as e:
+            log.error(f"Failed to load tool names: {e}")
+            return set()
     
     def get_preference(self, key: str, default: Any = None) -> Any:
         """
@@ -473,12 +934,10 @@ class SessionManager:
             return default
         
         try:
-            cursor = self.conn.cursor()
-            cursor.execute("SELECT value FROM user_preferences WHERE key = ?", (key,))
-            result = cursor.fetchone()
+            row = self._conn().execute(_SQL_GET_PREFERENCE, (key,)).fetchone()
             
-            if result:
-                value = json.loads(result[0])
+            if row:
+                value = _json_loads(row['value'])
                 self.user_preferences[key] = value
                 return value
             else:
@@ -512,7 +971,8 @@ class SessionManager:
             'plans_generated': self.session_stats['plans_generated'],
             'plans_executed': self.session_stats['plans_executed'],
             'errors_encountered': self.session_stats['errors_encountered'],
-            'recent_actions_count': len(self.recent_actions),
+            # Counted in memory so a summary never waits on the writer or the database
+            'recent_actions_count': min(self._interactions_recorded, 10),
             'conversation_turns': len(self.conversation_history)
         }
     
@@ -525,18 +985,27 @@ class SessionManager:
         """
         summary = self.get_session_summary()
         
-        # Calculate success rate
+        # Whole-session counts come from the history table; the in-memory
+        # counters are only used if the query is unavailable
         total_actions = summary['commands_executed']
         errors = summary['errors_encountered']
+        tool_usage: Counter = Counter()
+        
+        activity = self._get_session_activity()
+        if activity is not None:
+            total_actions = errors = 0
+            for action_type, tool_name, count, failures in activity:
+                if action_type == 'command':
+                    total_actions += count
+                errors += failures
+                if tool_name:
+                    tool_usage[tool_name] += count
+        
+        # Calculate success rate
         success_rate = ((total_actions - errors) / total_actions * 100) if total_actions > 0 else 100
         
         # Identify most used tools
-        tool_usage = {}
-        for action in self.recent_actions:
-            if action.get('tool'):
-                tool_usage[action['tool']] = tool_usage.get(action['tool'], 0) + 1
-        
-        most_used_tool = max(tool_usage.keys(), key=tool_usage.get) if tool_usage else None
+        most_used_tool = tool_usage.most_common(1)[0][0] if tool_usage else None
         
         return {
             'session_productivity': 'High' if total_actions > 10 else 'Medium' if total_actions > 5 else 'Low',
@@ -547,14 +1016,77 @@ class SessionManager:
             'learning_engagement': summary['explanations_requested']
         }
     
+    def _get_session_activity(self) -> Optional[List[sqlite3.Row]]:
+        """
+        Aggregates this session's history by action type and tool in one query.
+        
+        Returns:
+            List of (action_type, tool_name, count, failures) rows, or None if
+            the database is unavailable
+        """
+        if not self.conn:
+            return None
+        
+        # Make buffered interactions visible to the query
+        self.flush()
+        
+        try:
+            return self._conn().execute(_SQL_SESSION_ACTIVITY, (self.session_id,)).fetchall()
+        except sqlite3.Error as e:
+            log.error(f"Failed to aggregate session activity: {e}")
+            return None
+    
     # ==========================================
     # CLEANUP AND DESTRUCTION
     # ==========================================
     
+    def close(self):
+        """
+        Writes any buffered rows and closes every thread's database connection.
+        
+        Safe to call more than once. Also runs automatically at interpreter exit
+        and when the manager is used as a context manager.
+        """
+        if not self.conn:
+            return
+        
+        try:
+            self._release_pending_writes()
+            if self._writer_alive():
+                # The writer drains everything queued before the stop marker, then exits
+                self._write_queue.put(_WRITER_STOP)
+                self._writer.join()
+            else:
+                self._drain_writes_sync()
+        finally:
+            self.conn = None
+            _open_managers.discard(self)
+            with self._conns_lock:
+                connections, self._thread_conns = self._thread_conns, []
+        
+        for conn in connections:
+            try:
+                conn.commit()
+                conn.close()
+            except sqlite3.Error as e:
+                log.error(f"Failed to close session database cleanly: {e}")
+        log.info("SessionManager database connection closed")
+    
+    def __enter__(self) -> "SessionManager":
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
     def __del__(self):
         """
-        Ensures proper cleanup of database connections.
+        Best-effort cleanup for managers that were never closed explicitly.
+        
+        Finalizers may run during interpreter shutdown, after logging or sqlite3
+        have been torn down, so any error here is ignored; close() is the
+        reliable path.
         """
-        if self.conn:
-            self.conn.close()
-            log.info("SessionManager database connection closed")
+        try:
+            self.close()
+        except Exception:
+            pass
@@ -5,13 +5,214 @@
 # configuration, troubleshooting, and system administration tasks.
 # It leverages AI to provide intelligent guidance and command generation.
 
-import os
 import re
-from typing import Dict, Any, Tuple, Optional, List
+import types
+from typing import Dict, Any, Tuple, Optional, Mapping
 
 from agent.llm_engine import LLMEngine
 from utils.logger import log
 
+try:
+    import ahocorasick  # Optional: pyahocorasick classifies requests in one pass
+except ImportError:
+    ahocorasick = None
+
+# Package managers and their command templates
+_PACKAGE_MANAGER_COMMANDS = {
+    'apt': {
+        'install': 'sudo apt update && sudo apt install -y {package}',
+        'remove': 'sudo apt remove -y {package}',
+        'update': 'sudo apt update',
+        'upgrade': 'sudo apt upgrade -y',
+        'search': 'apt search {package}',
+        'info': 'apt show {package}'
+    },
+    'pip': {
+        'install': 'pip3 install {package}',
+        'remove': 'pip3 uninstall -y {package}',
+        'update': 'pip3 install --upgrade {package}',
+        'list': 'pip3 list',
+        'search': 'pip3 search {package}'
+    },
+    'go': {
+        'install': 'go install {package}@latest',
+        'get': 'go get -u {package}',
+        'list': 'go list -m all'
+    },
+    'npm': {
+        'install': 'npm install -g {package}',
+        'remove': 'npm uninstall -g {package}',
+        'update': 'npm update -g {package}',
+        'list': 'npm list -g'
+    },
+    'gem': {
+        'install': 'sudo gem install {package}',
+        'remove': 'sudo gem uninstall {package}',
+        'update': 'sudo gem update {package}',
+        'list': 'gem list'
+    },
+    'cargo': {
+        'install': 'cargo install {package}',
+        'update': 'cargo install --force {package}',
+        'list': 'cargo install --list'
+    },
+    'snap': {
+        'install': 'sudo snap install {package}',
+        'remove': 'sudo snap remove {package}',
+        'list': 'snap list'
+    }
+}
+PACKAGE_MANAGERS: Mapping[str, Mapping[str, str]] = types.MappingProxyType({
+    name: types.MappingProxyType(commands) for name, commands in _PACKAGE_MANAGER_COMMANDS.items()
+})
+
+# Common tool installation mappings
+TOOL_INSTALLATIONS: Mapping[str, str] = types.MappingProxyType({
+    'nmap': 'sudo apt update && sudo apt install -y nmap',
+    'gobuster': 'sudo apt update && sudo apt install -y gobuster',
+    'nikto': 'sudo apt update && sudo apt install -y nikto',
+    'sqlmap': 'sudo apt update && sudo apt install -y sqlmap',
+    'metasploit': 'curl https://raw.githubusercontent.com/rapid7/metasploit-omnibus/master/config/templates/metasploit-framework-wrappers/msfupdate.erb > msfinstall && chmod 755 msfinstall && ./msfinstall',
+    'burpsuite': 'sudo apt update && sudo apt install -y burpsuite',
+    'wireshark': 'sudo apt update && sudo apt install -y wireshark',
+    'hydra': 'sudo apt update && sudo apt install -y hydra',
+    'john': 'sudo apt update && sudo apt install -y john',
+    'hashcat': 'sudo apt update && sudo apt install -y hashcat',
+    'aircrack-ng': 'sudo apt update && sudo apt install -y aircrack-ng',
+    'golang': 'sudo apt update && sudo apt install -y golang-go',
+    'docker': 'curl -fsSL https://get.docker.com -o get-docker.sh && sudo sh get-docker.sh',
+    'rust': 'curl --proto "=https" --tlsv1.2 -sSf https://sh.rustup.rs | sh -s -- -y',
+    'nodejs': 'curl -fsSL https://deb.nodesource.com/setup_lts.x | sudo -E bash - && sudo apt install -y nodejs',
+    'python3-pip': 'sudo apt update && sudo apt install -y python3-pip',
+    'git': 'sudo apt update && sudo apt install -y git',
+    'vim': 'sudo apt update && sudo apt install -y vim',
+    'tmux': 'sudo apt update && sudo apt install -y tmux',
+    'zsh': 'sudo apt update && sudo apt install -y zsh',
+    'oh-my-zsh': 'sh -c "$(curl -fsSL https://raw.githubusercontent.com/ohmyzsh/ohmyzsh/master/tools/install.sh)"'
+})
+
+# Key views of the tables above, returned as-is by the agent accessors
+SUPPORTED_PACKAGE_MANAGERS: Tuple[str, ...] = tuple(PACKAGE_MANAGERS)
+INSTALLABLE_TOOLS: Tuple[str, ...] = tuple(TOOL_INSTALLATIONS)
+
+# Keyword groups for _classify_operation, checked in this priority order. Matching is
+# plain substring search (no word boundaries), e.g. "installing" counts as "install".
+_OPERATION_KEYWORDS = (
+    ('installation', ('install', 'setup', 'add', 'get')),
+    ('configuration', ('configure', 'config', 'set up', 'enable', 'disable')),
+    ('troubleshooting', ('error', 'not working', 'fix', 'broken', 'failed', 'permission denied')),
+)
+_OPERATION_PATTERNS = tuple(
+    (operation, re.compile('|'.join(map(re.escape, keywords)), re.IGNORECASE))
+    for operation, keywords in _OPERATION_KEYWORDS
+)
+
+
+def _build_operation_automaton() -> Optional[Any]:
+    """
+    Builds one Aho-Corasick automaton over every operation keyword.
+    
+    Each keyword maps to the index of its group in _OPERATION_KEYWORDS, so a single
+    scan of the request finds the highest-priority group that occurs anywhere in it.
+    
+    Returns:
+        The automaton, or None when pyahocorasick is unavailable
+    """
+    if ahocorasick is None:
+        return None
+    automaton = ahocorasick.Automaton()
+    for priority, (_, keywords) in enumerate(_OPERATION_KEYWORDS):
+        for keyword in keywords:
+            # A keyword listed in two groups keeps the higher-priority one
+            if keyword not in automaton:
+                automaton.add_word(keyword, priority)
+    automaton.make_automaton()
+    return automaton
+
+
+_OPERATION_AUTOMATON = _build_operation_automaton()
+
+# Filler words ignored when picking the tool name out of a request
+_TOOL_NAME_STOPWORDS = frozenset(['install', 'setup', 'please', 'can', 'you', 'help', 'me', 'with', 'the', 'tool'])
+
+# ==========================================
+# PROMPT TEMPLATES
+# ==========================================
+# The static instructions come first and the user's request is appended last, so
+# every call shares an identical prefix that provider-side prompt caches can reuse.
+
+_INSTALL_PROMPT_PREFIX = """You are a Linux system administrator expert. A user wants to install the software described in the request at the end.
+
+Determine the BEST way to install this on a Debian/Ubuntu-based system (like Kali Linux).
+
+Consider:
+1. Is this a system package (use apt)?
+2. Is this a Python package (use pip3)?
+3. Is this a Go tool (use go install)?
+4. Is this a Node.js package (use npm)?
+5. Is this a Ruby gem (use gem)?
+6. Does it need a special installation script?
+
+Respond with ONLY the exact command(s) to install it. If multiple commands are needed, chain them with &&.
+
+Examples:
+- "install requests library" → pip3 install requests
+- "install golang" → sudo apt update && sudo apt install -y golang-go
+- "install nuclei" → go install -v github.com/projectdiscovery/nuclei/v3/cmd/nuclei@latest
+- "install node" → curl -fsSL https://deb.nodesource.com/setup_lts.x | sudo -E bash - && sudo apt install -y nodejs
+"""
+
+_CONFIG_PROMPT_PREFIX = """You are a Linux system configuration expert. A user needs help with the configuration task in the request at the end.
+
+Provide the EXACT commands or configuration steps needed. Consider:
+1. Service configuration (systemctl, config files)
+2. Tool configuration (config files, environment variables)
+3. Permission settings (chmod, chown, user groups)
+4. Network configuration
+5. Security hardening
+
+Respond with the specific commands needed. Chain multiple commands with &&.
+
+Examples:
+- "configure postgresql for metasploit" → sudo systemctl start postgresql && sudo msfdb init
+- "setup docker permissions" → sudo usermod -aG docker $USER && newgrp docker
+- "configure burp proxy" → echo "export http_proxy=http://127.0.0.1:8080" >> ~/.bashrc && source ~/.bashrc
+"""
+
+_TROUBLE_PROMPT_PREFIX = """You are a Linux troubleshooting expert. A user has the problem described in the request at the end.
+
+Analyze the issue and provide the EXACT commands to fix it. Common issues:
+1. Permission denied → sudo, chmod, chown
+2. Command not found → install missing tool, update PATH
+3. Service not running → systemctl start/enable
+4. Network issues → firewall, routing, DNS
+5. Dependency issues → install missing libraries
+
+Provide the fix commands. Use && to chain multiple commands if needed.
+
+Examples:
+- "permission denied on /usr/bin/nmap" → sudo chmod +x /usr/bin/nmap
+- "docker: command not found" → curl -fsSL https://get.docker.com -o get-docker.sh && sudo sh get-docker.sh
+- "cannot connect to postgresql" → sudo systemctl start postgresql && sudo systemctl enable postgresql
+"""
+
+_GENERIC_PROMPT_PREFIX = """You are a Linux system administrator. Generate the exact command for the request at the end.
+
+Focus on:
+- System administration tasks
+- File operations
+- User management
+- Service management
+- Package operations
+
+Respond with ONLY the command(s). Chain with && if multiple commands needed.
+"""
+
+
+def _build_prompt(prefix: str, user_request: str, answer_label: str) -> str:
+    """Appends the user's request and the answer cue to a static prompt prefix."""
+    return f'{prefix}\nUser request: "{user_request}"\n\n{answer_label}:'
+
 
 class SystemOperationsAgent:
     """
@@ -34,76 +235,9 @@ class SystemOperationsAgent:
         """
         self.llm_engine = llm_engine
         
-        # Package managers and their patterns
-        self.package_managers = {
-            'apt': {
-                'install': 'sudo apt update && sudo apt install -y {package}',
-                'remove': 'sudo apt remove -y {package}',
-                'update': 'sudo apt update',
-                'upgrade': 'sudo apt upgrade -y',
-                'search': 'apt search {package}',
-                'info': 'apt show {package}'
-            },
-            'pip': {
-                'install': 'pip3 install {package}',
-                'remove': 'pip3 uninstall -y {package}',
-                'update': 'pip3 install --upgrade {package}',
-                'list': 'pip3 list',
-                'search': 'pip3 search {package}'
-            },
-            'go': {
-                'install': 'go install {package}@latest',
-                'get': 'go get -u {package}',
-                'list': 'go list -m all'
-            },
-            'npm': {
-                'install': 'npm install -g {package}',
-                'remove': 'npm uninstall -g {package}',
-                'update': 'npm update -g {package}',
-                'list': 'npm list -g'
-            },
-            'gem': {
-                'install': 'sudo gem install {package}',
-                'remove': 'sudo gem uninstall {package}',
-                'update': 'sudo gem update {package}',
-                'list': 'gem list'
-            },
-            'cargo': {
-                'install': 'cargo install {package}',
-                'update': 'cargo install --force {package}',
-                'list': 'cargo install --list'
-            },
-            'snap': {
-                'install': 'sudo snap install {package}',
-                'remove': 'sudo snap remove {package}',
-                'list': 'snap list'
-            }
-        }
-        
-        # Common tool installation mappings
-        self.tool_installations = {
-            'nmap': 'sudo apt update && sudo apt install -y nmap',
-            'gobuster': 'sudo apt update && sudo apt install -y gobuster',
-            'nikto': 'sudo apt update && sudo apt install -y nikto',
-            'sqlmap': 'sudo apt update && sudo apt install -y sqlmap',
-            'metasploit': 'curl https://raw.githubusercontent.com/rapid7/metasploit-omnibus/master/config/templates/metasploit-framework-wrappers/msfupdate.erb > msfinstall && chmod 755 msfinstall && ./msfinstall',
-            'burpsuite': 'sudo apt update && sudo apt install -y burpsuite',
-            'wireshark': 'sudo apt update && sudo apt install -y wireshark',
-            'hydra': 'sudo apt update && sudo apt install -y hydra',
-            'john': 'sudo apt update && sudo apt install -y john',
-            'hashcat': 'sudo apt update && sudo apt install -y hashcat',
-            'aircrack-ng': 'sudo apt update && sudo apt install -y aircrack-ng',
-            'golang': 'sudo apt update && sudo apt install -y golang-go',
-            'docker': 'curl -fsSL https://get.docker.com -o get-docker.sh && sudo sh get-docker.sh',
-            'rust': 'curl --proto "=https" --tlsv1.2 -sSf https://sh.rustup.rs | sh -s -- -y',
-            'nodejs': 'curl -fsSL https://deb.nodesource.com/setup_lts.x | sudo -E bash - && sudo apt install -y nodejs',
-            'python3-pip': 'sudo apt update && sudo apt install -y python3-pip',
-            'git': 'sudo apt update && sudo apt install -y git',
-            'vim': 'sudo apt update && sudo apt install -y vim',
-            'tmux': 'sudo apt update && sudo apt install -y tmux',
-            'zsh': 'sudo apt update && sudo apt install -y zsh',
-            'oh-my-zsh': 'sh -c "$(curl -fsSL https://raw.githubusercontent.com/ohmyzsh/ohmyzsh/master/tools/install.sh)"'
-        }
+        # Shared, read-only lookup tables (built once at import)
+        self.package_managers = PACKAGE_MANAGERS
+        self.tool_installations = TOOL_INSTALLATIONS
         
         log.info("SystemOperationsAgent initialized with comprehensive package management support")
     
@@ -117,7 +251,7 @@ class SystemOperationsAgent:
         Returns:
             Tuple of (success, command, explanation)
         """
-        log.info(f"Processing installation request: '{user_request}'")
+        log.info("Processing installation request: '%s'", user_request)
         
         # First, check if it's a known tool
         tool_name = self._extract_tool_name(user_request)
@@ -127,34 +261,14 @@ class SystemOperationsAgent:
             return True, command, explanation
         
         # Use AI to determine the best installation method
-        prompt = f"""You are a Linux system administrator expert. A user wants to: "{user_request}"
-
-Determine the BEST way to install this on a Debian/Ubuntu-based system (like Kali Linux).
-
-Consider:
-1. Is this a system package (use apt)?
-2. Is this a Python package (use pip3)?
-3. Is this a Go tool (use go install)?
-4. Is this a Node.js package (use npm)?
-5. Is this a Ruby gem (use gem)?
-6. Does it need a special installation script?
-
-Respond with ONLY the exact command(s) to install it. If multiple commands are needed, chain them with &&.
-
-Examples:
-- "install requests library" → pip3 install requests
-- "install golang" → sudo apt update && sudo apt install -y golang-go
-- "install nuclei" → go install -v github.com/projectdiscovery/nuclei/v3/cmd/nuclei@latest
-- "install node" → curl -fsSL https://deb.nodesource.com/setup_lts.x | sudo -E bash - && sudo apt install -y nodejs
-
-Command:"""
-
+        prompt = _build_prompt(_INSTALL_PROMPT_PREFIX, user_request, 'Command')
+        
         success, response = self.llm_engine.generate_response(prompt)
         
         if not success:
             return False, "", f"Failed to generate installation command: {response}"
         
-        command = response.strip().strip('`').strip('"').strip("'")
+        command = response.strip(' \t\n\r`"\'')
         
         if not command or len(command) < 3:
             return False, "", "Could not determine installation method"
@@ -172,26 +286,10 @@ Command:"""
         Returns:
             Tuple of (success, command/guidance, explanation)
         """
-        log.info(f"Processing configuration request: '{user_request}'")
+        log.info("Processing configuration request: '%s'", user_request)
+        
+        prompt = _build_prompt(_CONFIG_PROMPT_PREFIX, user_request, 'Commands')
         
-        prompt = f"""You are a Linux system configuration expert. A user needs help with: "{user_request}"
-
-Provide the EXACT commands or configuration steps needed. Consider:
-1. Service configuration (systemctl, config files)
-2. Tool configuration (config files, environment variables)
-3. Permission settings (chmod, chown, user groups)
-4. Network configuration
-5. Security hardening
-
-Respond with the specific commands needed. Chain multiple commands with &&.
-
-Examples:
-- "configure postgresql for metasploit" → sudo systemctl start postgresql && sudo msfdb init
-- "setup docker permissions" → sudo usermod -aG docker $USER && newgrp docker
-- "configure burp proxy" → echo "export http_proxy=http://127.0.0.1:8080" >> ~/.bashrc && source ~/.bashrc
-
-Commands:"""
-
         success, response = self.llm_engine.generate_response(prompt)
         
         if not success:
@@ -212,26 +310,10 @@ Commands:"""
         Returns:
             Tuple of (success, solution, explanation)
         """
-        log.info(f"Processing troubleshooting request: '{user_request}'")
+        log.info("Processing troubleshooting request: '%s'", user_request)
+        
+        prompt = _build_prompt(_TROUBLE_PROMPT_PREFIX, user_request, 'Fix commands')
         
-        prompt = f"""You are a Linux troubleshooting expert. A user has this problem: "{user_request}"
-
-Analyze the issue and provide the EXACT commands to fix it. Common issues:
-1. Permission denied → sudo, chmod, chown
-2. Command not found → install missing tool, update PATH
-3. Service not running → systemctl start/enable
-4. Network issues → firewall, routing, DNS
-5. Dependency issues → install missing libraries
-
-Provide the fix commands. Use && to chain multiple commands if needed.
-
-Examples:
-- "permission denied on /usr/bin/nmap" → sudo chmod +x /usr/bin/nmap
-- "docker: command not found" → curl -fsSL https://get.docker.com -o get-docker.sh && sudo sh get-docker.sh
-- "cannot connect to postgresql" → sudo systemctl start postgresql && sudo systemctl enable postgresql
-
-Fix commands:"""
-
         success, response = self.llm_engine.generate_response(prompt)
         
         if not success:
@@ -267,71 +349,57 @@ Fix commands:"""
     
     def _classify_operation(self, request: str) -> str:
         """Classify the type of system operation."""
-        request_lower = request.lower()
-        
-        install_keywords = ['install', 'setup', 'add', 'get']
-        config_keywords = ['configure', 'config', 'set up', 'enable', 'disable']
-        trouble_keywords = ['error', 'not working', 'fix', 'broken', 'failed', 'permission denied']
-        
-        for keyword in install_keywords:
-            if keyword in request_lower:
-                return 'installation'
-        
-        for keyword in config_keywords:
-            if keyword in request_lower:
-                return 'configuration'
-        
-        for keyword in trouble_keywords:
-            if keyword in request_lower:
-                return 'troubleshooting'
+        if _OPERATION_AUTOMATON is not None:
+            # One pass over the request finds every keyword; the lowest group index wins
+            best = len(_OPERATION_KEYWORDS)
+            for _, priority in _OPERATION_AUTOMATON.iter(request.lower()):
+                if priority < best:
+                    best = priority
+                    if best == 0:
+                        break
+            return _OPERATION_KEYWORDS[best][0] if best < len(_OPERATION_KEYWORDS) else 'generic'
+        
+        # One compiled alternation per group replaces a Python loop over each keyword
+        for operation, pattern in _OPERATION_PATTERNS:
+            if pattern.search(request):
+                return operation
         
         return 'generic'
     
     def _extract_tool_name(self, request: str) -> Optional[str]:
         """Extract tool name from the request."""
-        # Remove common words
-        words_to_remove = ['install', 'setup', 'please', 'can', 'you', 'help', 'me', 'with', 'the', 'tool']
+        first_candidate = None
         
-        words = request.lower().split()
-        filtered_words = [w for w in words if w not in words_to_remove]
-        
-        # Check each word against known tools
-        for word in filtered_words:
+        # Single pass: skip common words, return the first known tool
+        for word in request.lower().split():
+            if word in _TOOL_NAME_STOPWORDS:
+                continue
             if word in self.tool_installations:
                 return word
+            if first_candidate is None:
+                first_candidate = word
         
         # Return the most likely tool name (first non-common word)
-        return filtered_words[0] if filtered_words else None
+        return first_candidate
     
     def _handle_generic_operation(self, user_request: str) -> Tuple[bool, str, str]:
         """Handle generic system operations."""
-        prompt = f"""You are a Linux system administrator. Generate the exact command for: "{user_request}"
-
-Focus on:
-- System administration tasks
-- File operations
-- User management
-- Service management
-- Package operations
-
-Respond with ONLY the command(s). Chain with && if multiple commands needed.
-
-Command:"""
-
+        prompt = _build_prompt(_GENERIC_PROMPT_PREFIX, user_request, 'Command')
+        
         success, response = self.llm_engine.generate_response(prompt)
         
         if not success:
             return False, "", f"Failed to generate command: {response}"
         
-        command = response.strip().strip('`').strip('"').strip("'")
+        command = response.strip(' \t\n\r`"\'')
         explanation = f"System operation command for: {user_request}"
         
         return True, command, explanation
     
-    def get_supported_package_managers(self) -> List[str]:
-        """Returns list of supported package managers."""
-        return list(self.package_managers.keys())
+    def get_supported_package_managers(self) -> Tuple[str, ...]:
+        """Returns supported package managers (wrap in list() if mutation is needed)."""
+        return SUPPORTED_PACKAGE_MANAGERS
     
-    def get_installable_tools(self) -> List[str]:
-        """Returns list of tools with known installation commands."""
-        return list(self.tool_installations.keys())
+    def get_installable_tools(self) -> Tuple[str, ...]:
+        """Returns tools with known installation commands (wrap in list() if mutation is needed)."""
+        return INSTALLABLE_TOOLS
@@ -3,16 +3,36 @@ LINA FastAPI Application
 Main entry point for the REST API
 """
 import os
+import re
 import sys
+import importlib
+from contextlib import asynccontextmanager
 from pathlib import Path
+from types import ModuleType
+from typing import AsyncIterator, List
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 
+try:
+    import orjson  # Optional: faster serialization of every API response
+except ImportError:
+    orjson = None
+
+if orjson is not None:
+    from fastapi.responses import ORJSONResponse as DefaultResponse
+else:
+    DefaultResponse = JSONResponse
+
 # Add project root to path
 PROJECT_ROOT = Path(__file__).parent.parent
 sys.path.insert(0, str(PROJECT_ROOT))
 
+from utils.logger import log as logger
+
+# KEY=value line of the env file; surrounding whitespace is dropped from both parts
+_ENV_LINE = re.compile(r'^\s*([A-Za-z_][A-Za-z0-9_]*)\s*=\s*(.*?)\s*$')
+
 # Load environment variables from env file
 try:
     from dotenv import load_dotenv
@@ -28,16 +48,22 @@ except ImportError:
     if env_file.exists():
         with open(env_file, 'r') as f:
             for line in f:
-                line = line.strip()
-                if line and not line.startswith('#') and '=' in line:
-                    key, value = line.split('=', 1)
-                    os.environ[key.strip()] = value.strip()
+                # Blank and comment lines simply fail to match
+                match = _ENV_LINE.match(line)
+                # Like load_dotenv, variables already set in the environment win
+                if match:
+                    os.environ.setdefault(match.group(1), match.group(2))
+
+# Router modules under api.routers, included when this module is imported.
+# Set LINA_DISABLE_ROUTERS to a comma-separated list (e.g. "stream,files") to skip some.
+ROUTER_MODULES = ("session", "request", "command", "tools", "stream", "hash", "files")
 
-# Import routers
-from api.routers import session, request, command, tools, stream, hash, files
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Warm router state when the server starts"""
+    _preload_routers(_router_modules)
+    yield
 
-# Import services (initialize them)
-from api.services.session_service import SessionService
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -45,31 +71,77 @@ app = FastAPI(
     description="AI-Powered Cybersecurity Assistant API",
     version="1.0.0",
     docs_url="/api/docs",
-    redoc_url="/api/redoc"
+    redoc_url="/api/redoc",
+    default_response_class=DefaultResponse,
+    lifespan=lifespan
 )
 
+# Origins allowed to call the API from a browser
+_ALLOWED_ORIGINS = frozenset([
+    "http://localhost:3000",  # React dev server
+    "http://localhost:5173",  # Vite dev server
+    "http://127.0.0.1:3000",
+    "http://127.0.0.1:5173",
+])
+
 # CORS middleware for frontend access
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=[
-        "http://localhost:3000",  # React dev server
-        "http://localhost:5173",  # Vite dev server
-        "http://127.0.0.1:3000",
-        "http://127.0.0.1:5173",
-    ],
+    allow_origins=list(_ALLOWED_ORIGINS),
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
 )
 
+
+def _register_routers(app: FastAPI) -> List[ModuleType]:
+    """
+    Imports and includes every router module that is not disabled.
+    
+    Disabled routers are never imported, so the services behind them are not
+    loaded either.
+    
+    Args:
+        app: The FastAPI application to attach routers to
+        
+    Returns:
+        The imported router modules
+    """
+    disabled = {
+        name.strip() for name in os.getenv("LINA_DISABLE_ROUTERS", "").split(",") if name.strip()
+    }
+    modules = []
+    for name in ROUTER_MODULES:
+        if name in disabled:
+            continue
+        module = importlib.import_module(f"api.routers.{name}")
+        app.include_router(module.router)
+        modules.append(module)
+    return modules
+
+
+def _preload_routers(modules: List[ModuleType]) -> None:
+    """
+    Runs the optional preload() hook of each router module.
+    
+    Hooks warm state that would otherwise be built on the first request (e.g. the
+    tool registry index). Failures are logged and left to the lazy path to retry.
+    
+    Args:
+        modules: Router modules returned by _register_routers
+    """
+    for module in modules:
+        preload = getattr(module, "preload", None)
+        if preload is None:
+            continue
+        try:
+            preload()
+        except Exception as e:
+            logger.warning(f"Preload failed for {module.__name__}: {e}")
+
+
 # Include routers
-app.include_router(session.router)
-app.include_router(request.router)
-app.include_router(command.router)
-app.include_router(tools.router)
-app.include_router(stream.router)
-app.include_router(hash.router)
-app.include_router(files.router)
+_router_modules = _register_routers(app)
 
 
 @app.get("/")
@@ -95,24 +167,23 @@ async def health_check():
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
     """Global exception handler with CORS headers"""
-    import traceback
-    from utils.logger import log as logger
-    
     logger.error(f"Unhandled exception: {exc}", exc_info=True)
     
-    response = JSONResponse(
+    # Unhandled errors are answered outside CORSMiddleware, so mirror its headers here
+    origin = request.headers.get("origin")
+    return JSONResponse(
         status_code=500,
         content={
             "error": "Internal server error",
             "detail": str(exc) if os.getenv("DEBUG", "false").lower() == "true" else "An error occurred"
+        },
+        headers={
+            "Access-Control-Allow-Origin": origin if origin in _ALLOWED_ORIGINS else "*",
+            "Access-Control-Allow-Credentials": "true",
+            "Access-Control-Allow-Methods": "*",
+            "Access-Control-Allow-Headers": "*",
         }
     )
-    # Add CORS headers even for errors
-    response.headers["Access-Control-Allow-Origin"] = request.headers.get("origin", "*")
-    response.headers["Access-Control-Allow-Credentials"] = "true"
-    response.headers["Access-Control-Allow-Methods"] = "*"
-    response.headers["Access-Control-Allow-Headers"] = "*"
-    return response
 
 
 if __name__ == "__main__":
@@ -2,8 +2,21 @@
 Pydantic models for LINA API request/response schemas
 """
 from typing import Dict, Any, List, Optional, Literal
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 from datetime import datetime
+from enum import Enum
+
+
+# ==========================================
+# Enumerations
+# ==========================================
+
+class ExecStatus(str, Enum):
+    """Lifecycle state of a command execution; members compare equal to their string values"""
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
 
 
 # ==========================================
@@ -58,6 +71,12 @@ class CommandExecuteRequest(BaseModel):
         default="persistent",
         description="Execution mode (persistent tmux session, separate terminal, or background with output capture)"
     )
+    
+    @field_validator("execution_mode", mode="after")
+    @classmethod
+    def _normalize_execution_mode(cls, value: Optional[str]) -> str:
+        """Maps 'separate' and an explicit null onto 'background', the mode that captures output"""
+        return "background" if value in (None, "separate") else value
 
 
 # ==========================================
@@ -71,11 +90,6 @@ class SessionResponse(BaseModel):
     ai_engine: str
     created_at: datetime
     status: str = Field(default="active")
-    
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat()
-        }
 
 
 class RiskAssessment(BaseModel):
@@ -116,17 +130,12 @@ class CommandExecutionResponse(BaseModel):
     """Response from command execution"""
     execution_id: str
     command: str
-    status: Literal["running", "completed", "failed", "cancelled"]
+    status: ExecStatus
     output: Optional[str] = None
     return_code: Optional[int] = None
     start_time: datetime
     end_time: Optional[datetime] = None
     error: Optional[str] = None
-    
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat()
-        }
 
 
 class SessionStatusResponse(BaseModel):
@@ -139,11 +148,6 @@ class SessionStatusResponse(BaseModel):
     command_count: int
     tools_used: List[str]
     session_duration: str
-    
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat()
-        }
 
 
 class CommandHistoryEntry(BaseModel):
@@ -152,11 +156,6 @@ class CommandHistoryEntry(BaseModel):
     timestamp: datetime
     tool_name: Optional[str] = None
     success: Optional[bool] = None
-    
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat()
-        }
 
 
 class SessionAnalyticsResponse(BaseModel):
@@ -1,18 +1,18 @@
 """
 Command execution endpoints
 """
+from typing import Union
+
 from fastapi import APIRouter, HTTPException, status
+from fastapi.responses import JSONResponse
 
-from api.models import CommandExecuteRequest, CommandExecutionResponse, ErrorResponse
-from api.services.session_service import SessionService
-from api.services.command_service import CommandService
+from api.models import CommandExecuteRequest, CommandExecutionResponse, ErrorResponse, ExecStatus
+from api.services.session_service import session_service
+from api.services.command_service import command_service
 from utils.logger import log as logger
 
 router = APIRouter(prefix="/api/command", tags=["command"])
 
-# Global service instances
-session_service = SessionService()
-command_service = CommandService()
 
 
 @router.post("/execute", response_model=CommandExecutionResponse)
@@ -25,23 +25,20 @@ async def execute_command(request: CommandExecuteRequest) -> CommandExecutionRes
     - **auto_confirm**: Skip confirmation prompts
     - **execution_mode**: persistent (tmux) or separate (background with output)
     """
-    # Get session
-    session_data = session_service.get_session(request.session_id)
+    # Get session and mark it active
+    session_data = session_service.get_and_touch(request.session_id)
     if not session_data:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Session {request.session_id} not found"
         )
     
-    session_service.update_activity(request.session_id)
-    
     try:
         # Execute command with streaming
-        # Map 'separate' to 'background' for output capture, 'persistent' stays as tmux
-        exec_mode = "background" if request.execution_mode == "separate" else request.execution_mode or "background"
+        # 'separate' is already mapped to 'background' during validation; 'persistent' stays as tmux
         result = command_service.execute_stream(
             command=request.command,
-            execution_mode=exec_mode
+            execution_mode=request.execution_mode
         )
         
         # Add to session history
@@ -56,7 +53,7 @@ async def execute_command(request: CommandExecuteRequest) -> CommandExecutionRes
             return_code=result.return_code,
             start_time=result.start_time,
             end_time=result.end_time,
-            error=result.error if result.status == "failed" else None
+            error=result.error if result.status is ExecStatus.FAILED else None
         )
         
     except Exception as e:
@@ -68,13 +65,15 @@ async def execute_command(request: CommandExecuteRequest) -> CommandExecutionRes
 
 
 @router.get("/execution/{execution_id}", response_model=CommandExecutionResponse)
-async def get_execution_status(execution_id: str) -> CommandExecutionResponse:
+async def get_execution_status(execution_id: str) -> Union[CommandExecutionResponse, JSONResponse]:
     """Get status of a command execution"""
     result = command_service.get_execution(execution_id)
     if not result:
-        raise HTTPException(
+        # Clients poll this endpoint, so a missing execution is answered directly
+        # with the same body HTTPException would produce, skipping exception unwinding
+        return JSONResponse(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Execution {execution_id} not found"
+            content={"detail": f"Execution {execution_id} not found"}
         )
     
     # Return current state (output may be accumulating in real-time)
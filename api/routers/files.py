@@ -3,10 +3,12 @@ File management endpoints
 Save outputs and make them accessible to tools
 """
 import json
+import shutil
 from pathlib import Path
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, File, HTTPException, UploadFile, status
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Optional, Tuple
 
 from api.services.tool_executor.file_manager import FileManager
 from utils.logger import log as logger
@@ -16,12 +18,22 @@ router = APIRouter(prefix="/api/files", tags=["files"])
 # Initialize file manager
 file_manager = FileManager()
 
+# Default write buffer for saved files; large wordlists and hash dumps need far fewer
+# write() syscalls with 64 KiB than with the 8 KiB io default
+DEFAULT_WRITE_BUFFER_SIZE = 64 * 1024
+
 
 class SaveFileRequest(BaseModel):
     """Request to save content to a file"""
     filename: str = Field(..., description="Name of the file to save")
     content: str = Field(..., description="Content to save")
     directory: Optional[str] = Field(default=None, description="Subdirectory within uploads (e.g., 'hashes')")
+    buffer_size: int = Field(
+        default=DEFAULT_WRITE_BUFFER_SIZE,
+        ge=4096,
+        le=16 * 1024 * 1024,
+        description="Write buffer size in bytes"
+    )
 
 
 class SaveFileResponse(BaseModel):
@@ -31,6 +43,56 @@ class SaveFileResponse(BaseModel):
     message: str
 
 
+def _write_file(save_dir: Path, file_path: Path, content: str, buffer_size: int) -> None:
+    """Creates the target directory if needed and writes the content (blocking)"""
+    file_manager.ensure_directory(save_dir)
+    with open(file_path, 'w', encoding='utf-8', buffering=buffer_size) as f:
+        f.write(content)
+
+
+def _copy_upload(save_dir: Path, file_path: Path, source) -> None:
+    """Creates the target directory if needed and copies the upload in fixed-size chunks (blocking)"""
+    file_manager.ensure_directory(save_dir)
+    source.seek(0)
+    with open(file_path, 'wb') as f:
+        shutil.copyfileobj(source, f, DEFAULT_WRITE_BUFFER_SIZE)
+
+
+def _is_within(path: Path, root: Path) -> bool:
+    """Whether a resolved path lies inside root (Path.is_relative_to needs 3.9)"""
+    try:
+        path.relative_to(root)
+        return True
+    except ValueError:
+        return False
+
+
+def _resolve_save_path(filename: str, directory: Optional[str]) -> Tuple[Path, Path]:
+    """
+    Returns the (directory, file path) pair for a file saved under uploads.
+    
+    Raises:
+        HTTPException: 400 if the directory or filename would escape the uploads directory
+    """
+    upload_root = file_manager.upload_dir.resolve()
+    if directory:
+        save_dir = (upload_root / directory).resolve()
+    else:
+        save_dir = upload_root
+    
+    # Sanitize filename, keeping only its final component
+    safe_filename = file_manager._sanitize_filename(Path(filename).name)
+    file_path = (save_dir / safe_filename).resolve()
+    
+    if not safe_filename or not _is_within(save_dir, upload_root) or not _is_within(file_path, upload_root) \
+            or file_path == upload_root:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Target path must stay inside the uploads directory"
+        )
+    return save_dir, file_path
+
+
 @router.post("/save", response_model=SaveFileResponse)
 async def save_file(request: SaveFileRequest) -> SaveFileResponse:
     """
@@ -38,21 +100,11 @@ async def save_file(request: SaveFileRequest) -> SaveFileResponse:
     Files saved here are accessible to tools like hashcat and john.
     """
     try:
-        # Determine save directory
-        if request.directory:
-            save_dir = file_manager.upload_dir / request.directory
-        else:
-            save_dir = file_manager.upload_dir
-        
-        # Ensure directory exists
-        file_manager.ensure_directory(save_dir)
-        
-        # Sanitize filename
-        safe_filename = file_manager._sanitize_filename(request.filename)
-        file_path = save_dir / safe_filename
+        save_dir, file_path = _resolve_save_path(request.filename, request.directory)
         
-        # Write content
-        file_path.write_text(request.content)
+        # Ensure directory exists and write content off the event loop, so large
+        # saves don't stall other requests
+        await run_in_threadpool(_write_file, save_dir, file_path, request.content, request.buffer_size)
         
         logger.info(f"Saved file: {file_path}")
         
@@ -62,6 +114,8 @@ async def save_file(request: SaveFileRequest) -> SaveFileResponse:
             message=f"File saved to {file_path}"
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Failed to save file: {e}", exc_info=True)
         raise HTTPException(
@@ -69,3 +123,39 @@ async def save_file(request: SaveFileRequest) -> SaveFileResponse:
             detail=f"Failed to save file: {str(e)}"
         )
 
+
+@router.post("/upload", response_model=SaveFileResponse)
+async def upload_file(
+    file: UploadFile = File(..., description="File to upload"),
+    directory: Optional[str] = None
+) -> SaveFileResponse:
+    """
+    Upload a file into the uploads directory as multipart form data.
+    Unlike /save, the content never has to fit in memory as one string, so
+    large wordlists and capture files can be stored with constant memory use.
+    """
+    try:
+        save_dir, file_path = _resolve_save_path(file.filename or "upload", directory)
+        
+        # The multipart parser has already spooled the body to a temp file; copy it
+        # to its destination in 64 KiB blocks off the event loop
+        await run_in_threadpool(_copy_upload, save_dir, file_path, file.file)
+        
+        logger.info(f"Uploaded file: {file_path}")
+        
+        return SaveFileResponse(
+            success=True,
+            file_path=str(file_path),
+            message=f"File uploaded to {file_path}"
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to upload file: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to upload file: {str(e)}"
+        )
+    finally:
+        await file.close()
@@ -1,8 +1,12 @@
 """
 Hash generation endpoints
 """
-from typing import Optional
-from fastapi import APIRouter, HTTPException, status
+import itertools
+import time
+from pathlib import Path
+from typing import List, Optional
+from fastapi import APIRouter, File, HTTPException, UploadFile, status
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel, Field
 
 from api.services.hash_service import HashService
@@ -10,6 +14,15 @@ from utils.logger import log as logger
 
 router = APIRouter(prefix="/api/hash", tags=["hash"])
 
+# Upper bound on inputs per batch request
+MAX_BATCH_INPUTS = 10000
+
+# Default location for saved hashes (created on first save by HashService)
+HASH_UPLOAD_DIR = Path(__file__).resolve().parent.parent.parent / "uploads" / "hashes"
+
+# Disambiguates default filenames generated within the same clock tick
+_hash_file_counter = itertools.count()
+
 
 class HashRequest(BaseModel):
     """Request to generate a hash"""
@@ -30,6 +43,26 @@ class HashResponse(BaseModel):
     saved: bool = False
 
 
+class HashBatchRequest(BaseModel):
+    """Request to hash several texts with one algorithm"""
+    inputs: List[str] = Field(..., min_length=1, max_length=MAX_BATCH_INPUTS, description="Texts to hash")
+    hash_type: str = Field(default="sha256", description="Type of hash (md5, sha1, sha256, sha512, etc.)")
+
+
+class HashBatchResponse(BaseModel):
+    """Response from batch hash generation"""
+    hashes: List[str]
+    hash_type: str
+
+
+class FileHashResponse(BaseModel):
+    """Response from hashing an uploaded file"""
+    hash: str
+    hash_type: str
+    filename: Optional[str] = None
+    size: int
+
+
 @router.post("/generate", response_model=HashResponse)
 async def generate_hash(request: HashRequest) -> HashResponse:
     """
@@ -39,16 +72,14 @@ async def generate_hash(request: HashRequest) -> HashResponse:
     """
     try:
         if request.save_to_file and not request.output_path:
-            # Generate default filename
-            from pathlib import Path
-            from datetime import datetime
-            project_root = Path(__file__).parent.parent.parent
-            uploads_dir = project_root / "uploads" / "hashes"
-            uploads_dir.mkdir(parents=True, exist_ok=True)
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            request.output_path = str(uploads_dir / f"hash_{request.hash_type}_{timestamp}.txt")
+            # Generate default filename; nanosecond timestamp keeps names sortable and the
+            # counter keeps saves within the same second from overwriting each other
+            suffix = f"{time.time_ns()}_{next(_hash_file_counter)}"
+            request.output_path = str(HASH_UPLOAD_DIR / f"hash_{request.hash_type}_{suffix}.txt")
         
-        result = HashService.generate_and_save(
+        # Hashing large inputs and writing the file both block, so run them off the event loop
+        result = await run_in_threadpool(
+            HashService.generate_and_save,
             input_text=request.input_text,
             hash_type=request.hash_type,
             output_path=request.output_path if request.save_to_file else None
@@ -68,3 +99,56 @@ async def generate_hash(request: HashRequest) -> HashResponse:
             detail=f"Failed to generate hash: {str(e)}"
         )
 
+
+@router.post("/batch", response_model=HashBatchResponse)
+async def generate_hash_batch(request: HashBatchRequest) -> HashBatchResponse:
+    """
+    Generate hashes for a list of texts in one request.
+    
+    Digests are returned in the same order as the inputs.
+    """
+    try:
+        result = await run_in_threadpool(HashService.generate_hashes, request.inputs, request.hash_type)
+        return HashBatchResponse(**result)
+        
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        logger.error(f"Failed to generate hashes: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to generate hashes: {str(e)}"
+        )
+
+
+@router.post("/file", response_model=FileHashResponse)
+async def hash_file(
+    file: UploadFile = File(..., description="File to hash"),
+    hash_type: str = "sha256"
+) -> FileHashResponse:
+    """
+    Generate a hash of an uploaded file.
+    
+    The file is hashed in chunks, so large captures and disk images never have
+    to be held in memory.
+    """
+    try:
+        result = await run_in_threadpool(HashService.hash_stream, file.file, hash_type)
+        return FileHashResponse(filename=file.filename, **result)
+        
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        logger.error(f"Failed to hash file: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to hash file: {str(e)}"
+        )
+    finally:
+        await file.close()
@@ -2,16 +2,32 @@
 Request processing endpoints
 Handle natural language user requests
 """
+from typing import Any, Optional, Tuple
 from fastapi import APIRouter, HTTPException, status
+from starlette.concurrency import run_in_threadpool
 
 from api.models import ProcessRequest, ProcessResponse, RiskAssessment, ErrorResponse
-from api.services.session_service import SessionService
+from api.services.session_service import session_service
 from utils.logger import log as logger
 
 router = APIRouter(prefix="/api/request", tags=["request"])
 
-# Create service instance
-session_service = SessionService()
+
+def _normalize_database_match(database_match: Any, pattern_matched: Any) -> Tuple[Optional[bool], Optional[str]]:
+    """
+    Split the risk analyzer's database_match into a flag and the matched pattern.
+    
+    Args:
+        database_match: Either a bool or the name of the matched pattern
+        pattern_matched: Pattern reported separately when database_match is a bool
+        
+    Returns:
+        Tuple of (database_match as bool or None, pattern name or None)
+    """
+    if isinstance(database_match, str):
+        # A non-empty string means a match and names the matched pattern
+        return (True, database_match) if database_match else (None, None)
+    return (database_match if isinstance(database_match, bool) else None), (pattern_matched or None)
 
 
 @router.post("/process", response_model=ProcessResponse)
@@ -30,67 +46,68 @@ async def process_request(request: ProcessRequest) -> ProcessResponse:
     - tools_list: List of tools
     - error: Error response
     """
-    # Get session
-    session_data = session_service.get_session(request.session_id)
+    # Get session and mark it active
+    session_data = session_service.get_and_touch(request.session_id)
     if not session_data:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Session {request.session_id} not found"
         )
     
-    # Update activity
-    session_service.update_activity(request.session_id)
-    
     try:
         # Process request through Brain, passing mode for context
         # Use lazy-loaded brain (initializes on first use if needed)
-        brain = session_data.get_brain()
-        result = brain.process_request(request.user_input, mode=session_data.mode)
+        # Both calls block on setup and LLM round trips, so they run off the event loop
+        brain = await run_in_threadpool(session_data.get_brain)
+        result = await run_in_threadpool(brain.process_request, request.user_input, mode=session_data.mode)
+        
+        # Bind the lookup once; the response below reads a dozen keys from the result
+        get = result.get
+        command_type = get('type')
+        command = get('command')
+        message = get('message')
+        tool_name = get('tool_name')
         
         # Add command to history if it's a command or tool_request
-        command_type = result.get('type')
-        if (command_type == 'command' or command_type == 'tool_request') and result.get('command'):
-            session_data.interface_state.add_command(result['command'])
-            if result.get('tool_name'):
-                session_data.interface_state.add_tool_used(result['tool_name'])
-        logger.info(f"Processed request. Type: {command_type}, Has command: {bool(result.get('command'))}")
+        if (command_type == 'command' or command_type == 'tool_request') and command:
+            session_data.interface_state.add_command(command)
+            if tool_name:
+                session_data.interface_state.add_tool_used(tool_name)
+        logger.info(f"Processed request. Type: {command_type}, Has command: {bool(command)}")
         
         # Convert risk dict to RiskAssessment model if present
         risk = None
-        if result.get('risk'):
-            risk_dict = result['risk']
-            # Handle database_match - it can be a string or bool
-            database_match = risk_dict.get('database_match')
-            if isinstance(database_match, str):
-                # If it's a string, convert to bool (True if not empty/None) or use as pattern_matched
-                pattern_matched = database_match if database_match else None
-                database_match_bool = bool(database_match) if database_match else None
-            else:
-                database_match_bool = database_match if isinstance(database_match, bool) else None
-                pattern_matched = risk_dict.get('pattern_matched')
+        risk_dict = get('risk')
+        if risk_dict:
+            risk_get = risk_dict.get
+            reason = risk_get('reason')
+            explanation = risk_get('explanation')
+            database_match_bool, pattern_matched = _normalize_database_match(
+                risk_get('database_match'), risk_get('pattern_matched')
+            )
             
             risk = RiskAssessment(
-                level=risk_dict.get('level', 'UNKNOWN'),
-                confidence=risk_dict.get('confidence'),
-                reason=risk_dict.get('reason') or risk_dict.get('explanation'),
+                level=risk_get('level', 'UNKNOWN'),
+                confidence=risk_get('confidence'),
+                reason=reason or explanation,
                 database_match=database_match_bool,  # Use boolean version
-                pattern_matched=pattern_matched or (database_match if isinstance(database_match, str) else None),
-                ai_analysis=risk_dict.get('ai_analysis'),
-                explanation=risk_dict.get('explanation') or risk_dict.get('reason')
+                pattern_matched=pattern_matched,
+                ai_analysis=risk_get('ai_analysis'),
+                explanation=explanation or reason
             )
         
         # Build response
         response = ProcessResponse(
-            type=result.get('type', 'error'),
-            message=result.get('message'),
-            command=result.get('command'),
-            tool_name=result.get('tool_name'),
-            explanation=result.get('explanation'),
+            type=command_type or 'error',
+            message=message,
+            command=command,
+            tool_name=tool_name,
+            explanation=get('explanation'),
             risk=risk,
-            plan=result.get('plan'),
-            tools=result.get('tools'),
-            error=result.get('message') if result.get('type') == 'error' else None,
-            suggestions=result.get('suggestions')  # Multiple command options for suggester mode
+            plan=get('plan'),
+            tools=get('tools'),
+            error=message if command_type == 'error' else None,
+            suggestions=get('suggestions')  # Multiple command options for suggester mode
         )
         
         return response
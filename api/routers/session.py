@@ -1,8 +1,11 @@
 """
 Session management endpoints
 """
+import time
+from collections import OrderedDict
+from itertools import islice
 from fastapi import APIRouter, HTTPException, status
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Tuple
 
 from api.models import (
     SessionCreateRequest,
@@ -12,13 +15,21 @@ from api.models import (
     CommandHistoryEntry,
     ErrorResponse
 )
-from api.services.session_service import SessionService
+from api.services.session_service import session_service
 from utils.logger import log as logger
 
 router = APIRouter(prefix="/api/session", tags=["session"])
 
-# Use singleton instance - all routers will share the same session store
-session_service = SessionService()
+
+# Seconds a session's summary and learning insights are reused while no new command arrives
+ANALYTICS_CACHE_TTL = 3.0
+
+# Most sessions whose analytics are kept; the least recently computed is evicted first
+ANALYTICS_CACHE_MAXSIZE = 256
+
+# session_id -> (computed_at, commands_executed, session_summary, learning_insights),
+# oldest computation first
+_analytics_cache: "OrderedDict[str, Tuple[float, int, Dict[str, Any], Optional[Dict[str, Any]]]]" = OrderedDict()
 
 
 @router.post("/create", response_model=SessionResponse, status_code=status.HTTP_201_CREATED)
@@ -61,15 +72,13 @@ async def create_session(request: SessionCreateRequest) -> SessionResponse:
 @router.get("/{session_id}/status", response_model=SessionStatusResponse)
 async def get_session_status(session_id: str) -> SessionStatusResponse:
     """Get current status of a session"""
-    session_data = session_service.get_session(session_id)
+    session_data = session_service.get_and_touch(session_id)
     if not session_data:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Session {session_id} not found"
         )
     
-    session_service.update_activity(session_id)
-    
     duration_minutes = session_data.interface_state.get_session_duration()
     duration_str = f"{duration_minutes:.2f} minutes" if isinstance(duration_minutes, (int, float)) else str(duration_minutes)
     
@@ -96,10 +105,13 @@ async def get_command_history(session_id: str) -> list[CommandHistoryEntry]:
         )
     
     # Convert command history to response model
-    # Note: interface_state.command_history is a list of strings
+    # Note: interface_state.command_history is a bounded deque of strings
     # We'd need to enhance it to store more metadata for full history
+    # Last 100 commands, oldest first; walking from the right end touches only those
+    recent = list(islice(reversed(session_data.interface_state.command_history), 100))
+    recent.reverse()
     history = []
-    for cmd in session_data.interface_state.command_history[-100:]:  # Last 100 commands
+    for cmd in recent:
         history.append(CommandHistoryEntry(
             command=cmd,
             timestamp=session_data.last_activity  # Would need to track individual timestamps
@@ -118,6 +130,36 @@ async def get_session_analytics(session_id: str) -> SessionAnalyticsResponse:
             detail=f"Session {session_id} not found"
         )
     
+    commands_executed = session_data.interface_state.session_stats.get("commands_executed", 0)
+    session_summary, learning_insights = _get_session_manager_analytics(session_data, commands_executed)
+    
+    duration = (session_data.last_activity - session_data.created_at).total_seconds() / 60.0
+    
+    return SessionAnalyticsResponse(
+        session_id=session_id,
+        duration_minutes=duration,
+        commands_executed=commands_executed,
+        unique_tools_used=len(session_data.interface_state.tools_used),
+        conversations=session_data.interface_state.conversations,
+        explanations_requested=session_summary.get("explanations_requested", 0),
+        plans_generated=session_summary.get("plans_generated", 0),
+        tools_used_list=list(session_data.interface_state.tools_used),
+        learning_insights=learning_insights
+    )
+
+
+def _get_session_manager_analytics(session_data, commands_executed: int) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+    """
+    Returns the session manager's summary and learning insights for a session.
+    
+    Dashboards poll analytics far more often than sessions change, so results are
+    reused for ANALYTICS_CACHE_TTL seconds unless a new command has been recorded.
+    """
+    now = time.monotonic()
+    cached = _analytics_cache.get(session_data.session_id)
+    if cached and cached[1] == commands_executed and now - cached[0] < ANALYTICS_CACHE_TTL:
+        return cached[2], cached[3]
+    
     # Try to get analytics from session manager, but don't fail if it's not available
     session_summary = {}
     learning_insights = None
@@ -135,19 +177,25 @@ async def get_session_analytics(session_id: str) -> SessionAnalyticsResponse:
     except Exception as e:
         logger.warning(f"Failed to get session analytics: {e}")
     
-    duration = (session_data.last_activity - session_data.created_at).total_seconds() / 60.0
+    _remember_analytics(session_data.session_id, (now, commands_executed, session_summary, learning_insights))
+    return session_summary, learning_insights
+
+
+def _remember_analytics(session_id: str, entry: Tuple[float, int, Dict[str, Any], Optional[Dict[str, Any]]]) -> None:
+    """
+    Caches a session's analytics, dropping expired entries and bounding the cache
     
-    return SessionAnalyticsResponse(
-        session_id=session_id,
-        duration_minutes=duration,
-        commands_executed=session_data.interface_state.session_stats.get("commands_executed", 0),
-        unique_tools_used=len(session_data.interface_state.tools_used),
-        conversations=session_data.interface_state.conversations,
-        explanations_requested=session_summary.get("explanations_requested", 0),
-        plans_generated=session_summary.get("plans_generated", 0),
-        tools_used_list=list(session_data.interface_state.tools_used),
-        learning_insights=learning_insights
-    )
+    Entries stay ordered by computation time, so expired ones (including those of
+    sessions that timed out or were abandoned) are all at the front.
+    """
+    _analytics_cache[session_id] = entry
+    _analytics_cache.move_to_end(session_id)
+    now = entry[0]
+    while _analytics_cache:
+        computed_at = next(iter(_analytics_cache.values()))[0]
+        if now - computed_at < ANALYTICS_CACHE_TTL and len(_analytics_cache) <= ANALYTICS_CACHE_MAXSIZE:
+            break
+        _analytics_cache.popitem(last=False)
 
 
 @router.delete("/{session_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -158,4 +206,5 @@ async def delete_session(session_id: str):
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Session {session_id} not found"
         )
+    _analytics_cache.pop(session_id, None)
 
@@ -1,22 +1,42 @@
 """
 WebSocket streaming endpoint for real-time command output
 """
+import asyncio
 import json
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, HTTPException, status
-from typing import Dict, Set
+from typing import Any, Dict, List, Optional
 
-from api.services.session_service import SessionService
-from api.services.command_service import CommandService
+from api.services.session_service import session_service
+from api.services.command_service import command_service
 from utils.logger import log as logger
 
-# Global service instances
-session_service = SessionService()
-command_service = CommandService()
+try:
+    import orjson  # Optional: faster encoding/decoding of WebSocket messages
+except ImportError:
+    orjson = None
+
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so one except clause covers both
+_json_loads = orjson.loads if orjson is not None else json.loads
+
 
 router = APIRouter(tags=["stream"])
 
-# Store active WebSocket connections per session
-_active_connections: Dict[str, Set[WebSocket]] = {}
+# Seconds to collect further output lines before sending an output message
+OUTPUT_BATCH_WINDOW = 0.02
+
+# Store active WebSocket connections per session. Only touched from the event loop
+# and never across an await, so each register/unregister step runs uninterrupted.
+# A session has only a handful of sockets, so a list is cheap to remove from and
+# faster than a set to iterate when broadcasting.
+_active_connections: Dict[str, List[WebSocket]] = {}
+
+
+async def _send_json(websocket: WebSocket, payload: Dict[str, Any]) -> None:
+    """Sends a JSON text frame, encoded with orjson when it is installed"""
+    if orjson is not None:
+        await websocket.send_text(orjson.dumps(payload).decode('utf-8'))
+    else:
+        await websocket.send_json(payload)
 
 
 @router.websocket("/ws/session/{session_id}")
@@ -50,9 +70,7 @@ async def websocket_stream(websocket: WebSocket, session_id: str):
     await websocket.accept()
     
     # Add to active connections
-    if session_id not in _active_connections:
-        _active_connections[session_id] = set()
-    _active_connections[session_id].add(websocket)
+    _active_connections.setdefault(session_id, []).append(websocket)
     
     logger.info(f"WebSocket connected for session {session_id}")
     
@@ -62,7 +80,7 @@ async def websocket_stream(websocket: WebSocket, session_id: str):
             data = await websocket.receive_text()
             
             try:
-                message = json.loads(data)
+                message = _json_loads(data)
                 message_type = message.get('type')
                 
                 if message_type == 'execute':
@@ -71,7 +89,7 @@ async def websocket_stream(websocket: WebSocket, session_id: str):
                     execution_mode = message.get('execution_mode', 'background')
                     
                     if not command:
-                        await websocket.send_json({
+                        await _send_json(websocket, {
                             "type": "error",
                             "data": "No command provided"
                         })
@@ -80,41 +98,55 @@ async def websocket_stream(websocket: WebSocket, session_id: str):
                     # Update session activity
                     session_service.update_activity(session_id)
                     
+                    # Output lines are pushed from CommandService's reader threads onto
+                    # this loop; None marks the end of the execution
+                    loop = asyncio.get_running_loop()
+                    chunks: "asyncio.Queue[Optional[str]]" = asyncio.Queue()
+                    
+                    def push_chunk(chunk: Optional[str]) -> None:
+                        loop.call_soon_threadsafe(chunks.put_nowait, chunk)
+                    
                     # Execute command with streaming
                     result = command_service.execute_stream(
                         command=command,
-                        execution_mode=execution_mode
+                        execution_mode=execution_mode,
+                        on_output=push_chunk,
+                        on_complete=lambda: push_chunk(None)
                     )
                     
                     # Send execution started
-                    await websocket.send_json({
+                    await _send_json(websocket, {
                         "type": "status",
                         "execution_id": result.execution_id,
                         "data": "Command execution started",
                         "status": "running"
                     })
                     
-                    # Stream output (simplified - in production would use async generator)
-                    # For now, poll the result and send updates
-                    import asyncio
-                    
-                    last_output_length = 0
-                    while result.status == "running":
-                        await asyncio.sleep(0.1)  # Poll every 100ms
-                        
-                        # Send new output chunks
-                        current_output = result.output
-                        if len(current_output) > last_output_length:
-                            new_chunk = current_output[last_output_length:]
-                            await websocket.send_json({
+                    # Forward output in batches: after the first line arrives, wait one
+                    # short window so chatty tools send one message instead of hundreds
+                    finished = False
+                    while not finished:
+                        lines = []
+                        chunk = await chunks.get()
+                        if chunk is not None:
+                            await asyncio.sleep(OUTPUT_BATCH_WINDOW)
+                        while True:
+                            if chunk is None:
+                                finished = True
+                                break
+                            lines.append(chunk)
+                            if chunks.empty():
+                                break
+                            chunk = chunks.get_nowait()
+                        if lines:
+                            await _send_json(websocket, {
                                 "type": "output",
                                 "execution_id": result.execution_id,
-                                "data": new_chunk
+                                "data": "".join(lines)
                             })
-                            last_output_length = len(current_output)
                     
                     # Send completion
-                    await websocket.send_json({
+                    await _send_json(websocket, {
                         "type": "complete",
                         "execution_id": result.execution_id,
                         "data": result.output,
@@ -125,19 +157,19 @@ async def websocket_stream(websocket: WebSocket, session_id: str):
                     
                 elif message_type == "ping":
                     # Heartbeat
-                    await websocket.send_json({
+                    await _send_json(websocket, {
                         "type": "pong",
                         "data": "ok"
                     })
                     
             except json.JSONDecodeError:
-                await websocket.send_json({
+                await _send_json(websocket, {
                     "type": "error",
                     "data": "Invalid JSON message"
                 })
             except Exception as e:
                 logger.error(f"WebSocket error: {e}", exc_info=True)
-                await websocket.send_json({
+                await _send_json(websocket, {
                     "type": "error",
                     "data": f"Error: {str(e)}"
                 })
@@ -148,8 +180,12 @@ async def websocket_stream(websocket: WebSocket, session_id: str):
         logger.error(f"WebSocket error: {e}", exc_info=True)
     finally:
         # Remove from active connections
-        if session_id in _active_connections:
-            _active_connections[session_id].discard(websocket)
-            if not _active_connections[session_id]:
-                del _active_connections[session_id]
+        connections = _active_connections.get(session_id)
+        if connections is not None:
+            try:
+                connections.remove(websocket)
+            except ValueError:
+                pass
+            if not connections:
+                _active_connections.pop(session_id, None)
 
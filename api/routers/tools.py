@@ -1,28 +1,76 @@
 """
 Tools management endpoints
 """
-import json
-import subprocess
+import hashlib
+import os
+import time
 from pathlib import Path
-from typing import Dict, Any
-from fastapi import APIRouter, HTTPException, status
+from typing import Dict, Any, FrozenSet, List, Optional, Tuple
+from fastapi import APIRouter, HTTPException, Request, Response, status
+from starlette.concurrency import run_in_threadpool
 
-from api.models import ToolsListResponse, ToolInfo, ToolExecuteRequest, ToolExecutionResponse
+from api.models import ToolsListResponse, ToolInfo, ToolExecuteRequest, ToolExecutionResponse, ExecStatus
 from api.services.lina_service import LINAService
-from api.services.session_service import SessionService
-from api.services.command_service import CommandService
+from api.services.session_service import session_service
+from api.services.command_service import command_service
 from api.services.tool_executor import UniversalToolExecutor
 from utils.logger import log as logger
 
 router = APIRouter(prefix="/api/tools", tags=["tools"])
 
-# Global service instances
-session_service = SessionService()
-command_service = CommandService()
+# Seconds a tool command may run before its current (partial) state is reported
+TOOL_OUTPUT_WAIT = 0.5
+
+# Seconds a PATH scan stays valid; newly installed tools show up after this
+INSTALLED_TOOLS_TTL = 60.0
+
+# (scan time, executable names found on PATH)
+_installed_cache: Tuple[float, FrozenSet[str]] = (0.0, frozenset())
+
+# Registry data only changes on edits and install status is rescanned every
+# INSTALLED_TOOLS_TTL, so clients may reuse a response briefly and then revalidate
+TOOLS_CACHE_CONTROL = "max-age=30"
+
+# (parsed registry, its entries in registry order, the entries keyed by lower-cased
+# tool name); rebuilt when LINAService hands back a freshly parsed registry
+_tools_index: Optional[Tuple[Any, List[Dict[str, Any]], Dict[str, Dict[str, Any]]]] = None
 
 # Initialize universal tool executor
 _uni_executor = None
 
+
+def _load_tools_index() -> Tuple[List[Dict[str, Any]], Dict[str, Dict[str, Any]]]:
+    """Get the registry entries in order and indexed by lower-cased name"""
+    global _tools_index
+    tools_data = LINAService.get_tool_registry()
+    if _tools_index is None or _tools_index[0] is not tools_data:
+        # Handle both list and dict formats
+        tools_list = []
+        if isinstance(tools_data, list):
+            tools_list = tools_data
+        elif isinstance(tools_data, dict):
+            tools_list = list(tools_data.values())
+        
+        # First entry wins on duplicate names, as the old linear search did
+        index: Dict[str, Dict[str, Any]] = {}
+        for tool_data in tools_list:
+            index.setdefault(tool_data.get('name', '').lower(), tool_data)
+        _tools_index = (tools_data, tools_list, index)
+        logger.info(f"Tool registry indexed: {len(index)} tools")
+    
+    return _tools_index[1], _tools_index[2]
+
+
+def get_tool_entries() -> List[Dict[str, Any]]:
+    """Get every tool registry entry in registry order, duplicates included"""
+    return _load_tools_index()[0]
+
+
+def get_tools_by_name() -> Dict[str, Dict[str, Any]]:
+    """Get the tool registry indexed by lower-cased name (first entry wins)"""
+    return _load_tools_index()[1]
+
+
 def get_universal_executor() -> UniversalToolExecutor:
     """Get or create universal tool executor instance"""
     global _uni_executor
@@ -38,15 +86,15 @@ def get_universal_executor() -> UniversalToolExecutor:
                 execution_mode="background"
             )
             
-            # Wait a bit for initial output (for synchronous tools)
-            import time
-            time.sleep(0.5)
+            # Return as soon as short tools finish; long-running ones report what
+            # they have produced so far once the wait expires
+            result.wait(TOOL_OUTPUT_WAIT)
             
             # Get current state
             status_result = command_service.get_execution(result.execution_id)
             if status_result:
                 return {
-                    'success': status_result.status == 'completed',
+                    'success': status_result.status is ExecStatus.COMPLETED,
                     'output': status_result.output or '',
                     'errors': [status_result.error] if status_result.error else [],
                     'return_code': status_result.return_code or 0
@@ -68,47 +116,108 @@ def get_universal_executor() -> UniversalToolExecutor:
     return _uni_executor
 
 
+def preload() -> None:
+    """Load the tool registry and universal executor before the first request"""
+    get_tools_by_name()
+    get_universal_executor()
+
+
+def _scan_path_executables() -> FrozenSet[str]:
+    """
+    Collect the executable file names in every PATH directory once
+    
+    Matches shutil.which: directories and files without execute permission
+    are not counted.
+    """
+    names = set()
+    for directory in os.environ.get('PATH', '').split(os.pathsep):
+        try:
+            with os.scandir(directory or '.') as entries:
+                for entry in entries:
+                    if entry.name in names:
+                        continue
+                    try:
+                        if not entry.is_dir() and os.access(entry.path, os.X_OK):
+                            names.add(entry.name)
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+    return frozenset(names)
+
+
+def get_installed_executables() -> FrozenSet[str]:
+    """Get the executable names on PATH, rescanning once INSTALLED_TOOLS_TTL has passed"""
+    global _installed_cache
+    scanned_at, executables = _installed_cache
+    now = time.monotonic()
+    if not scanned_at or now - scanned_at > INSTALLED_TOOLS_TTL:
+        executables = _scan_path_executables()
+        _installed_cache = (now, executables)
+    return executables
+
+
 def check_tool_installed(tool_name: str) -> bool:
-    """Check if a tool is installed on the system"""
-    try:
-        result = subprocess.run(
-            ['which', tool_name],
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL,
-            timeout=2
-        )
-        return result.returncode == 0
-    except Exception:
+    """
+    Check if a tool is installed on the system
+    
+    Looks the name up in a cached PATH scan instead of spawning `which` per tool,
+    so listing the whole registry costs one scan per INSTALLED_TOOLS_TTL.
+    """
+    return tool_name in get_installed_executables()
+
+
+def _make_etag(*parts: Any) -> str:
+    """Build a quoted ETag from the values a response was derived from"""
+    digest = hashlib.md5(":".join(map(str, parts)).encode('utf-8')).hexdigest()
+    return f'"{digest}"'
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    """Check whether the client's If-None-Match already names this ETag"""
+    if_none_match = request.headers.get('if-none-match')
+    if not if_none_match:
         return False
+    return any(tag.strip() in (etag, '*') for tag in if_none_match.split(','))
+
+
+def _not_modified(etag: str) -> Response:
+    """Empty 304 response carrying the caching headers"""
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers={"ETag": etag, "Cache-Control": TOOLS_CACHE_CONTROL}
+    )
 
 
 @router.get("/list", response_model=ToolsListResponse)
-async def list_tools() -> ToolsListResponse:
+async def list_tools(request: Request, response: Response) -> ToolsListResponse:
     """
     Get list of all available tools
     
     Returns all tools from the registry with installation status
     """
     try:
-        environment = LINAService.get_environment()
-        tool_registry_path = environment['paths']['tool_registry']
-        
-        # Load tool registry
-        with open(tool_registry_path, 'r', encoding='utf-8') as f:
-            tools_data = json.load(f)
+        tool_entries = get_tool_entries()
+        # The PATH rescan is the only blocking part, so run it off the event loop once
+        # and test every tool against the result
+        executables = await run_in_threadpool(get_installed_executables)
+        installed_flags = [tool_data.get('name', '') in executables for tool_data in tool_entries]
         
-        # Handle both list and dict formats
-        tools_list = []
-        if isinstance(tools_data, list):
-            tools_list = tools_data
-        elif isinstance(tools_data, dict):
-            tools_list = list(tools_data.values())
+        # The response only depends on the registry file and install status
+        etag = _make_etag(
+            LINAService.get_tool_registry_mtime(),
+            "".join('1' if installed else '0' for installed in installed_flags)
+        )
+        if _etag_matches(request, etag):
+            return _not_modified(etag)
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = TOOLS_CACHE_CONTROL
         
         # Convert to ToolInfo models
         tools = []
         categories_set = set()
         
-        for tool_data in tools_list:
+        for tool_data, installed in zip(tool_entries, installed_flags):
             tool_name = tool_data.get('name', '')
             category = tool_data.get('category', 'unknown')
             categories_set.add(category)
@@ -119,7 +228,7 @@ async def list_tools() -> ToolsListResponse:
                 category=category,
                 keywords=tool_data.get('keywords', []),
                 risk_level=tool_data.get('risk_level', 'UNKNOWN'),
-                installed=check_tool_installed(tool_name)
+                installed=installed
             )
             tools.append(tool_info)
         
@@ -141,29 +250,11 @@ async def list_tools() -> ToolsListResponse:
 
 
 @router.get("/{tool_name}", response_model=ToolInfo)
-async def get_tool_info(tool_name: str) -> ToolInfo:
+async def get_tool_info(tool_name: str, request: Request, response: Response) -> ToolInfo:
     """Get detailed information about a specific tool"""
     try:
-        environment = LINAService.get_environment()
-        tool_registry_path = environment['paths']['tool_registry']
-        
-        # Load tool registry
-        with open(tool_registry_path, 'r', encoding='utf-8') as f:
-            tools_data = json.load(f)
-        
-        # Handle both list and dict formats
-        tools_list = []
-        if isinstance(tools_data, list):
-            tools_list = tools_data
-        elif isinstance(tools_data, dict):
-            tools_list = list(tools_data.values())
-        
         # Find the tool
-        tool_data = None
-        for tool in tools_list:
-            if tool.get('name', '').lower() == tool_name.lower():
-                tool_data = tool
-                break
+        tool_data = get_tools_by_name().get(tool_name.lower())
         
         if not tool_data:
             raise HTTPException(
@@ -171,13 +262,22 @@ async def get_tool_info(tool_name: str) -> ToolInfo:
                 detail=f"Tool '{tool_name}' not found"
             )
         
+        name = tool_data.get('name', '')
+        installed = check_tool_installed(name)
+        
+        etag = _make_etag(LINAService.get_tool_registry_mtime(), name, installed)
+        if _etag_matches(request, etag):
+            return _not_modified(etag)
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = TOOLS_CACHE_CONTROL
+        
         return ToolInfo(
-            name=tool_data.get('name', ''),
+            name=name,
             description=tool_data.get('description', ''),
             category=tool_data.get('category', 'unknown'),
             keywords=tool_data.get('keywords', []),
             risk_level=tool_data.get('risk_level', 'UNKNOWN'),
-            installed=check_tool_installed(tool_data.get('name', ''))
+            installed=installed
         )
         
     except HTTPException:
@@ -204,7 +304,7 @@ async def execute_tool(tool_name: str, request: ToolExecuteRequest) -> ToolExecu
     Note: The tool_name in the path should match request.tool_name
     """
     # Validate session
-    session_data = session_service.get_session(request.session_id)
+    session_data = session_service.get_and_touch(request.session_id)
     if not session_data:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -217,8 +317,6 @@ async def execute_tool(tool_name: str, request: ToolExecuteRequest) -> ToolExecu
         # Update request to use path tool_name
         request.tool_name = exec_tool_name
     
-    session_service.update_activity(request.session_id)
-    
     try:
         # Get universal executor
         executor = get_universal_executor()
@@ -2,17 +2,33 @@
 Command execution service with streaming support
 Wraps CommandExecutor for API use with output streaming
 """
+import io
+import os
+import codecs
+import locale
+import selectors
 import subprocess
 import asyncio
+import time
 import uuid
 from datetime import datetime
 from typing import Dict, Any, Optional, AsyncGenerator, Callable
 from queue import Queue
-from threading import Thread
+from threading import Event, Thread
 
 from agent.command_executor import CommandExecutor
+from api.models import ExecStatus
 from utils.logger import log as logger
 
+# Seconds to wait for output readers after the process exits before finalizing a result
+PIPE_DRAIN_TIMEOUT = 5.0
+
+# Bytes requested per read from a command's output pipes
+PIPE_READ_SIZE = 64 * 1024
+
+# Seconds between process exit checks while the output pipes are quiet
+PROCESS_POLL_INTERVAL = 0.5
+
 
 class CommandExecutionResult:
     """Result of a command execution"""
@@ -20,13 +36,26 @@ class CommandExecutionResult:
     def __init__(self, execution_id: str, command: str):
         self.execution_id = execution_id
         self.command = command
-        self.status = "running"  # running, completed, failed, cancelled
+        self.status = ExecStatus.RUNNING
         self.output = ""
         self.error = ""
         self.return_code: Optional[int] = None
         self.start_time = datetime.now()
         self.end_time: Optional[datetime] = None
         self._process: Optional[subprocess.Popen] = None
+        self._done = Event()
+    
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until the execution has finished and its output is final
+        
+        Args:
+            timeout: Maximum seconds to wait, or None to wait indefinitely
+            
+        Returns:
+            True if the execution finished, False if the timeout expired first
+        """
+        return self._done.wait(timeout)
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary"""
@@ -46,6 +75,7 @@ class CommandService:
     """
     Service for executing commands with streaming output support.
     Provides both synchronous and asynchronous execution modes.
+    Routers share the module-level command_service instance below.
     """
     
     def __init__(self):
@@ -58,15 +88,21 @@ class CommandService:
         self,
         command: str,
         execution_mode: str = "background",
-        on_output: Optional[Callable[[str], None]] = None
+        on_output: Optional[Callable[[str], None]] = None,
+        on_complete: Optional[Callable[[], None]] = None
     ) -> CommandExecutionResult:
         """
         Execute a command with streaming output
         
+        Both callbacks run on worker threads; async callers should hop back to their
+        loop (e.g. with loop.call_soon_threadsafe).
+        
         Args:
             command: Command to execute
             execution_mode: "background" (capture output) or "tmux" (use tmux)
-            on_output: Optional callback for each output chunk
+            on_output: Optional callback for each stdout and stderr line
+            on_complete: Optional callback run once the result is final and all
+                output has been read
             
         Returns:
             CommandExecutionResult instance
@@ -80,103 +116,158 @@ class CommandService:
         try:
             if execution_mode == "background":
                 # Execute in background and capture output
+                # Pipes are read unbuffered in binary and decoded by _pump_output
                 process = subprocess.Popen(
                     command,
                     shell=True,
                     stdout=subprocess.PIPE,
                     stderr=subprocess.PIPE,
-                    text=True,
-                    bufsize=1,  # Line buffered
-                    universal_newlines=True
+                    bufsize=0
                 )
                 
                 result._process = process
                 
-                # Start threads to read stdout and stderr
-                stdout_thread = Thread(
-                    target=self._read_stream,
-                    args=(process.stdout, result, "output", on_output),
-                    daemon=True
-                )
-                stderr_thread = Thread(
-                    target=self._read_stream,
-                    args=(process.stderr, result, "error", on_output),
-                    daemon=True
-                )
-                
-                stdout_thread.start()
-                stderr_thread.start()
-                
-                # Wait for process completion in a separate thread
+                # One thread per execution reads both pipes and then reaps the process
                 def wait_process():
                     try:
+                        # Drain the pipes first so the final status implies complete output
+                        self._pump_output(process, result, on_output)
                         process.wait()
                         result.return_code = process.returncode
                         result.end_time = datetime.now()
                         if process.returncode == 0:
-                            result.status = "completed"
+                            result.status = ExecStatus.COMPLETED
                         else:
-                            result.status = "failed"
+                            result.status = ExecStatus.FAILED
                         logger.info(f"Execution {execution_id} completed with code {process.returncode}")
                     except Exception as e:
                         logger.error(f"Error waiting for process: {e}")
-                        result.status = "failed"
+                        result.status = ExecStatus.FAILED
                         result.error = str(e)
                         result.end_time = datetime.now()
+                    finally:
+                        result._done.set()
+                        self._notify_complete(on_complete)
                 
                 wait_thread = Thread(target=wait_process, daemon=True)
                 wait_thread.start()
+                return result
                 
             else:
                 # Use existing CommandExecutor for tmux mode
                 # This returns immediately, doesn't capture output
                 output = self._executor._send_to_tmux(command)
                 result.output = output
-                result.status = "completed"
+                result.status = ExecStatus.COMPLETED
                 result.end_time = datetime.now()
                 result.return_code = 0
                 
         except Exception as e:
             logger.error(f"Execution {execution_id} failed: {e}", exc_info=True)
-            result.status = "failed"
+            result.status = ExecStatus.FAILED
             result.error = str(e)
             result.end_time = datetime.now()
         
+        # tmux mode and startup failures finish synchronously
+        result._done.set()
+        self._notify_complete(on_complete)
         return result
     
     @staticmethod
-    def _read_stream(stream, result: CommandExecutionResult, attr: str, on_output: Optional[Callable[[str], None]]):
-        """Read from stream and update result"""
+    def _notify_complete(on_complete: Optional[Callable[[], None]]):
+        """Run the completion callback, logging instead of raising on errors"""
+        if on_complete:
+            try:
+                on_complete()
+            except Exception as e:
+                logger.error(f"Error in completion callback: {e}")
+    
+    @staticmethod
+    def _pump_output(process: subprocess.Popen, result: CommandExecutionResult, on_output: Optional[Callable[[str], None]]):
+        """
+        Read stdout and stderr of a process on the calling thread until both close
+        
+        Output is decoded like a text-mode pipe (locale encoding, universal newlines)
+        and recorded line by line. Reading stops PIPE_DRAIN_TIMEOUT seconds after
+        the process exits, because background children can keep the pipes open.
+        
+        Args:
+            process: Process started with binary stdout/stderr pipes
+            result: Execution result to append output to
+            on_output: Optional callback for each stdout and stderr line
+        """
+        encoding = locale.getpreferredencoding(False)
+        selector = selectors.DefaultSelector()
+        # attr -> (newline-translating decoder, unterminated tail of the last read)
+        state = {}
+        for stream, attr in ((process.stdout, "output"), (process.stderr, "error")):
+            selector.register(stream, selectors.EVENT_READ, attr)
+            decoder = io.IncrementalNewlineDecoder(
+                codecs.getincrementaldecoder(encoding)(errors='replace'), translate=True
+            )
+            state[attr] = [decoder, ""]
+        
+        deadline = None
         try:
-            for line in iter(stream.readline, ''):
-                if not line:
-                    break
-                
-                line_text = line.rstrip('\n\r')
-                if not line_text:
-                    continue
-                
-                # Update result
-                if attr == "output":
-                    result.output += line  # Keep newline for proper formatting
-                    logger.debug(f"Execution {result.execution_id} stdout: {line_text[:100]}")
+            while selector.get_map():
+                if deadline is None and process.poll() is not None:
+                    deadline = time.monotonic() + PIPE_DRAIN_TIMEOUT
+                if deadline is None:
+                    timeout = PROCESS_POLL_INTERVAL
                 else:
-                    result.error += line
-                    logger.debug(f"Execution {result.execution_id} stderr: {line_text[:100]}")
+                    timeout = deadline - time.monotonic()
+                    if timeout <= 0:
+                        logger.debug(f"Execution {result.execution_id}: output pipes still open after exit, stop reading")
+                        break
                 
-                # Call callback if provided
-                if on_output:
-                    try:
-                        on_output(line)
-                    except Exception as e:
-                        logger.error(f"Error in output callback: {e}")
+                for key, _ in selector.select(timeout):
+                    attr = key.data
+                    decoder, tail = state[attr]
+                    data = os.read(key.fd, PIPE_READ_SIZE)
+                    # An empty read is EOF, which also flushes the decoder
+                    text = tail + decoder.decode(data, final=not data)
+                    *lines, tail = text.split('\n')
+                    for line in lines:
+                        CommandService._record_line(result, attr, line + '\n', on_output)
+                    
+                    if data:
+                        state[attr][1] = tail
+                    else:
+                        # The last line may lack a newline; record it as is
+                        if tail:
+                            CommandService._record_line(result, attr, tail, on_output)
+                        selector.unregister(key.fileobj)
         except Exception as e:
-            logger.error(f"Error reading stream: {e}")
+            logger.error(f"Error reading output of execution {result.execution_id}: {e}")
         finally:
+            selector.close()
+            for stream in (process.stdout, process.stderr):
+                try:
+                    stream.close()
+                except Exception:
+                    pass
+    
+    @staticmethod
+    def _record_line(result: CommandExecutionResult, attr: str, line: str, on_output: Optional[Callable[[str], None]]):
+        """Append one output line to the result and pass it to the callback"""
+        line_text = line.rstrip('\n\r')
+        if not line_text:
+            return
+        
+        # Update result
+        if attr == "output":
+            result.output += line
+            logger.debug(f"Execution {result.execution_id} stdout: {line_text[:100]}")
+        else:
+            result.error += line
+            logger.debug(f"Execution {result.execution_id} stderr: {line_text[:100]}")
+        
+        # Call callback if provided
+        if on_output:
             try:
-                stream.close()
-            except:
-                pass
+                on_output(line)
+            except Exception as e:
+                logger.error(f"Error in output callback: {e}")
     
     async def execute_stream_async(
         self,
@@ -243,10 +334,10 @@ class CommandService:
     def cancel_execution(self, execution_id: str) -> bool:
         """Cancel a running execution"""
         result = self._active_executions.get(execution_id)
-        if result and result._process and result.status == "running":
+        if result and result._process and result.status is ExecStatus.RUNNING:
             try:
                 result._process.terminate()
-                result.status = "cancelled"
+                result.status = ExecStatus.CANCELLED
                 result.end_time = datetime.now()
                 logger.info(f"Execution {execution_id} cancelled")
                 return True
@@ -257,6 +348,9 @@ class CommandService:
     
     def cleanup_execution(self, execution_id: str):
         """Remove execution from tracking"""
-        if execution_id in self._active_executions:
-            del self._active_executions[execution_id]
+        self._active_executions.pop(execution_id, None)
+
+
+# Shared instance - all routers import this so executions are visible to every endpoint
+command_service = CommandService()
 
@@ -4,10 +4,14 @@ Generates various hash types from input strings or files
 """
 import hashlib
 import subprocess
-from typing import Dict, Any, Optional
+from typing import Dict, Any, BinaryIO, List, Optional
 from pathlib import Path
 from utils.logger import log as logger
 
+# Bytes read per step when hashing files; large enough that the digest, not the
+# Python loop, dominates
+HASH_CHUNK_SIZE = 64 * 1024
+
 
 class HashService:
     """Service for generating hashes of various types"""
@@ -27,6 +31,33 @@ class HashService:
         'blake2s': hashlib.blake2s,
     }
     
+    # Spellings clients commonly send (sha256, SHA256, sha3-256, SHA3-256) mapped to
+    # the canonical name, so the usual case is one dict lookup with no string copies
+    _HASH_ALIASES = {
+        alias: name
+        for name in SUPPORTED_HASHES
+        for alias in (name, name.upper(), name.replace('_', '-'), name.replace('_', '-').upper())
+    }
+    
+    @classmethod
+    def _resolve_hash_type(cls, hash_type: str) -> str:
+        """
+        Map a requested hash type to its canonical SUPPORTED_HASHES name.
+        
+        Args:
+            hash_type: Hash type as given by the caller, in any case, with - or _
+            
+        Returns:
+            Canonical hash name
+        """
+        name = cls._HASH_ALIASES.get(hash_type)
+        if name is None:
+            # Mixed-case spellings miss the table; normalize them the long way
+            name = hash_type.lower().replace('-', '_')
+            if name not in cls.SUPPORTED_HASHES:
+                raise ValueError(f"Unsupported hash type: {hash_type}. Supported: {', '.join(cls.SUPPORTED_HASHES.keys())}")
+        return name
+    
     @classmethod
     def generate_hash(cls, input_text: str, hash_type: str = 'sha256') -> Dict[str, Any]:
         """
@@ -39,12 +70,10 @@ class HashService:
         Returns:
             Dictionary with hash, hash_type, and input info
         """
-        hash_type_lower = hash_type.lower().replace('-', '_')
-        
-        if hash_type_lower not in cls.SUPPORTED_HASHES:
-            raise ValueError(f"Unsupported hash type: {hash_type}. Supported: {', '.join(cls.SUPPORTED_HASHES.keys())}")
-        
+        hash_type_lower = cls._resolve_hash_type(hash_type)
         hash_func = cls.SUPPORTED_HASHES[hash_type_lower]
+        # One-shot constructor over the whole buffer: the MD5/SHA-1/SHA-2 constructors
+        # are OpenSSL-backed and use SHA-NI where available; keep this a single call
         hash_obj = hash_func(input_text.encode('utf-8'))
         hash_value = hash_obj.hexdigest()
         
@@ -56,6 +85,59 @@ class HashService:
             'command': f"echo -n '{input_text}' | {hash_type_lower}sum | cut -d' ' -f1"
         }
     
+    @classmethod
+    def generate_hashes(cls, inputs: List[str], hash_type: str = 'sha256') -> Dict[str, Any]:
+        """
+        Generate hashes for many input texts with the same algorithm.
+        
+        Args:
+            inputs: Texts to hash
+            hash_type: Type of hash (md5, sha256, etc.)
+            
+        Returns:
+            Dictionary with hash_type and the hex digests in input order
+        """
+        # Resolve the constructor once for the whole batch
+        hash_type_lower = cls._resolve_hash_type(hash_type)
+        hash_func = cls.SUPPORTED_HASHES[hash_type_lower]
+        
+        return {
+            'hashes': [hash_func(text.encode('utf-8')).hexdigest() for text in inputs],
+            'hash_type': hash_type_lower
+        }
+    
+    @classmethod
+    def hash_stream(cls, stream: BinaryIO, hash_type: str = 'sha256') -> Dict[str, Any]:
+        """
+        Generate a hash from a binary file object without loading it into memory.
+        
+        Args:
+            stream: Readable binary file object, consumed from its current position
+            hash_type: Type of hash (md5, sha256, etc.)
+            
+        Returns:
+            Dictionary with hash, hash_type, and the number of bytes hashed
+        """
+        hash_type_lower = cls._resolve_hash_type(hash_type)
+        hash_obj = cls.SUPPORTED_HASHES[hash_type_lower]()
+        # Read into one reusable buffer and feed views of it, so no per-chunk bytes
+        # objects are allocated; update() releases the GIL for chunks this large
+        buffer = bytearray(HASH_CHUNK_SIZE)
+        view = memoryview(buffer)
+        size = 0
+        while True:
+            read = stream.readinto(buffer)
+            if not read:
+                break
+            hash_obj.update(view[:read])
+            size += read
+        
+        return {
+            'hash': hash_obj.hexdigest(),
+            'hash_type': hash_type_lower,
+            'size': size
+        }
+    
     @classmethod
     def save_hash_to_file(
         cls,
@@ -78,8 +160,9 @@ class HashService:
         """
         output_file = Path(output_path)
         
-        # Ensure directory exists
-        output_file.parent.mkdir(parents=True, exist_ok=True)
+        # Ensure directory exists; after the first save this is a single stat
+        if not output_file.parent.is_dir():
+            output_file.parent.mkdir(parents=True, exist_ok=True)
         
         # Write hash to file (format: hash or hash:input)
         if input_text:
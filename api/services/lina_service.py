@@ -4,8 +4,9 @@ Wraps the existing LINA Brain and agents for API use
 """
 import os
 import sys
+import json
 import importlib.util
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
 from pathlib import Path
 
 # Add project root to path
@@ -42,6 +43,8 @@ class LINAService:
     """
     
     _environment: Optional[Dict[str, Any]] = None
+    # (mtime_ns, parsed JSON) of the tool registry file
+    _registry_cache: Optional[Tuple[int, Any]] = None
     
     @classmethod
     def get_environment(cls) -> Dict[str, Any]:
@@ -51,6 +54,37 @@ class LINAService:
             cls._environment = initialize_phoenix_foundation()
         return cls._environment
     
+    @classmethod
+    def get_tool_registry(cls) -> Any:
+        """
+        Get the parsed tool registry, re-reading the file only when it changes
+        
+        Returns:
+            The registry JSON as stored on disk (a list or dict of tool entries).
+            The same object is returned until the file's mtime changes, so callers
+            must not mutate it.
+        """
+        registry_path = cls.get_environment()['paths']['tool_registry']
+        mtime = os.stat(registry_path).st_mtime_ns
+        cached = cls._registry_cache
+        if cached is None or cached[0] != mtime:
+            with open(registry_path, 'r', encoding='utf-8') as f:
+                cached = (mtime, json.load(f))
+            cls._registry_cache = cached
+            logger.info(f"Tool registry loaded from {registry_path}")
+        return cached[1]
+    
+    @classmethod
+    def get_tool_registry_mtime(cls) -> int:
+        """
+        Get the modification time of the tool registry currently in use
+        
+        Returns:
+            st_mtime_ns of the registry file the cached JSON was parsed from
+        """
+        cls.get_tool_registry()
+        return cls._registry_cache[0]
+    
     @classmethod
     def create_brain(cls, expert_role: str) -> Brain:
         """
@@ -61,28 +61,13 @@ class SessionService:
     """
     Manages user sessions and their associated LINA components.
     Each session maintains its own Brain instance and state.
-    Singleton pattern to ensure all routers share the same session store.
+    Routers share the module-level session_service instance below.
     """
-    _instance = None
-    _sessions: Dict[str, SessionData] = {}
-    
-    def __new__(cls):
-        """Singleton pattern - return same instance"""
-        if cls._instance is None:
-            cls._instance = super(SessionService, cls).__new__(cls)
-            cls._instance._initialized = False
-        return cls._instance
     
     def __init__(self):
-        """Initialize session service (only once due to singleton)"""
-        if self._initialized:
-            return
-        # Use class variable for persistence - only initialize if empty
-        if not hasattr(SessionService, '_sessions') or not SessionService._sessions:
-            SessionService._sessions = {}
-        self._sessions = SessionService._sessions  # Reference the class variable
-        self._initialized = True
-        logger.info(f"SessionService initialized (singleton) - {len(self._sessions)} existing sessions")
+        """Initialize session service"""
+        self._sessions: Dict[str, SessionData] = {}
+        logger.info("SessionService initialized")
     
     def create_session(self, role: str, ai_engine: str = "Cloud AI (Google Gemini)", mode: Optional[str] = None) -> str:
         """
@@ -174,12 +159,23 @@ class SessionService:
         Returns:
             True if session exists, False otherwise
         """
-        session = self.get_session(session_id)
+        return self.get_and_touch(session_id) is not None
+    
+    def get_and_touch(self, session_id: str) -> Optional[SessionData]:
+        """
+        Get session data by ID and mark it active, in a single lookup
+        
+        Args:
+            session_id: Session identifier
+            
+        Returns:
+            SessionData if found, None otherwise
+        """
+        session = self._sessions.get(session_id)
         if session:
             session.last_activity = datetime.now()
             session.interface_state.update_activity()
-            return True
-        return False
+        return session
     
     def delete_session(self, session_id: str) -> bool:
         """
@@ -206,3 +202,7 @@ class SessionService:
         """Get total number of active sessions"""
         return len(self._sessions)
 
+
+# Shared instance - all routers import this so they use the same session store
+session_service = SessionService()
+
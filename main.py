@@ -3,11 +3,20 @@ Minimal main.py for LINA API
 Provides the required classes and functions for the API layer
 """
 import os
+import re
+import threading
+from collections import deque
 from pathlib import Path
-from typing import Dict, Any, Set
+from typing import Dict, Any, Deque, Set
 from datetime import datetime
 from dataclasses import dataclass, field
 
+# KEY=value line of the env file; surrounding whitespace is dropped from both parts
+_ENV_LINE = re.compile(r'^\s*([A-Za-z_][A-Za-z0-9_]*)\s*=\s*(.*?)\s*$')
+
+# Commands kept per session; older entries fall off so long sessions stay bounded
+COMMAND_HISTORY_LIMIT = 500
+
 
 class OutputManager:
     """Manages command output capture and storage"""
@@ -38,8 +47,10 @@ class InterfaceState:
     session_stats: Dict[str, Any] = field(default_factory=lambda: {"commands_executed": 0})
     tools_used: Set[str] = field(default_factory=set)
     conversations: int = 0
-    command_history: list = field(default_factory=list)
+    command_history: Deque[str] = field(default_factory=lambda: deque(maxlen=COMMAND_HISTORY_LIMIT))
     created_at: datetime = field(default_factory=datetime.now)
+    # Guards writes only; handlers and worker threads may record into one session at once
+    _mutation_lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False, compare=False)
     
     def update_activity(self):
         """Update last activity timestamp"""
@@ -51,12 +62,14 @@ class InterfaceState:
     
     def add_command(self, command: str):
         """Add a command to history"""
-        self.command_history.append(command)
-        self.session_stats["commands_executed"] = self.session_stats.get("commands_executed", 0) + 1
+        with self._mutation_lock:
+            self.command_history.append(command)
+            self.session_stats["commands_executed"] = self.session_stats.get("commands_executed", 0) + 1
     
     def add_tool_used(self, tool_name: str):
         """Add a tool to the used tools set"""
-        self.tools_used.add(tool_name)
+        with self._mutation_lock:
+            self.tools_used.add(tool_name)
 
 
 def initialize_phoenix_foundation() -> Dict[str, Any]:
@@ -82,10 +95,11 @@ def initialize_phoenix_foundation() -> Dict[str, Any]:
         if env_file.exists():
             with open(env_file, 'r') as f:
                 for line in f:
-                    line = line.strip()
-                    if line and not line.startswith('#') and '=' in line:
-                        key, value = line.split('=', 1)
-                        os.environ[key.strip()] = value.strip()
+                    # Blank and comment lines simply fail to match
+                    match = _ENV_LINE.match(line)
+                    # Like load_dotenv, variables already set in the environment win
+                    if match:
+                        os.environ.setdefault(match.group(1), match.group(2))
     
     # Load config
     config_path = PROJECT_ROOT / "core" / "config.yaml"
@@ -0,0 +1,27 @@
+"""
+Output streaming tests for CommandService
+"""
+import threading
+
+import pytest
+
+pytest.importorskip("pydantic")
+pytest.importorskip("rich")
+
+from api.services.command_service import CommandService
+
+
+def test_on_output_receives_stdout_and_stderr_lines():
+    lines = []
+    done = threading.Event()
+
+    result = CommandService().execute_stream(
+        "echo out-line; echo err-line >&2",
+        on_output=lines.append,
+        on_complete=done.set
+    )
+
+    assert done.wait(10)
+    assert "out-line\n" in lines
+    assert "err-line\n" in lines
+    assert result.error == "err-line\n"
@@ -0,0 +1,49 @@
+"""
+Path confinement tests for the file save/upload endpoints
+"""
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api.routers import files
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(files.file_manager, "upload_dir", tmp_path / "uploads")
+    app = FastAPI()
+    app.include_router(files.router)
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("directory", ["../../escape", "/etc", "/tmp"])
+def test_upload_rejects_directory_outside_uploads(client, directory):
+    response = client.post(
+        "/api/files/upload",
+        params={"directory": directory},
+        files={"file": ("payload.bin", b"data")}
+    )
+    assert response.status_code == 400
+
+
+def test_save_rejects_directory_outside_uploads(client):
+    response = client.post(
+        "/api/files/save",
+        json={"filename": "payload.txt", "content": "data", "directory": "../.."}
+    )
+    assert response.status_code == 400
+
+
+def test_upload_strips_path_from_filename(client, tmp_path):
+    response = client.post(
+        "/api/files/upload",
+        params={"directory": "hashes"},
+        files={"file": ("../../payload.bin", b"data")}
+    )
+    assert response.status_code == 200
+    saved = tmp_path / "uploads" / "hashes" / "payload.bin"
+    assert saved.read_bytes() == b"data"
@@ -0,0 +1,168 @@
+"""
+Static risk matcher tests: every fast path must report the same entry as a plain
+per-pattern loop over the database in priority order
+"""
+import json
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("google.generativeai")
+
+from agent import risk_manager as rm
+
+RISK_DATABASE = Path(__file__).resolve().parents[1] / "core" / "registry" / "risk_database.json"
+
+COMMANDS = [
+    "",
+    "ls -la",
+    "ls; rm -rf ~",
+    "cat /etc/passwd",
+    "less notes.txt",
+    "pwd",
+    "cd /tmp",
+    "echo hello",
+    "echo hi > /dev/mem",
+    "echo c > /proc/sysrq-trigger",
+    "echo nameserver 1.1.1.1 > /etc/resolv.conf",
+    "rm -rf /",
+    "rm -rf /etc/ssh",
+    "rm -rf /lost+found",
+    "sudo rm -rf /",
+    "dd if=/dev/zero of=/dev/sda bs=1M",
+    "dd if=/dev/zero of=/dev/mem",
+    "mkfs.ext4 /dev/sda1",
+    "mkfs.xfs /dev/sdb",
+    "systemctl restart nginx",
+    "systemctl stop firewalld",
+    "systemctl status nginx",
+    ":(){ :|:& };:",
+    "x :& };: y",
+    "killall -9 nginx",
+    "kill -9 1",
+    "nmap -sV 10.0.0.1",
+    "grub-install /dev/sda",
+]
+
+
+def _loop_match(manager, command):
+    """The reference matcher: first compiled pattern, in priority order, that matches"""
+    for i, (_, compiled, _) in enumerate(manager.compiled_patterns):
+        if compiled.search(command):
+            return i
+    return None
+
+
+def _make_manager(tmp_path, database_path):
+    return rm.RiskManager(None, str(database_path), str(tmp_path / "risk_cache.sqlite"))
+
+
+@pytest.fixture(autouse=True)
+def no_forced_ai(monkeypatch):
+    monkeypatch.delenv("LINA_FORCE_AI_RISK", raising=False)
+    monkeypatch.delenv("LINA_OVERLAP_AI_RISK", raising=False)
+
+
+@pytest.fixture
+def manager(tmp_path):
+    manager = _make_manager(tmp_path, RISK_DATABASE)
+    yield manager
+    manager.close()
+
+
+@pytest.fixture
+def make_database(tmp_path):
+    def make(entries):
+        path = tmp_path / "risk_database.json"
+        path.write_text(json.dumps(entries))
+        rm._load_risk_database_file.cache_clear()
+        return _make_manager(tmp_path, path)
+    yield make
+    rm._load_risk_database_file.cache_clear()
+
+
+@pytest.mark.parametrize("command", COMMANDS)
+def test_matcher_agrees_with_per_pattern_loop(manager, command):
+    assert manager._match_static_index(command) == _loop_match(manager, command)
+
+
+@pytest.mark.parametrize("command", COMMANDS)
+def test_prefilter_never_hides_a_match(manager, command):
+    assert manager.static_triggers is not None
+    manager.static_triggers = None
+    assert manager._match_static_index(command) == _loop_match(manager, command)
+
+
+def test_patterns_with_groups_or_unanchored_branches_stay_out_of_union(manager):
+    standalone = {manager.compiled_patterns[i][0] for i in manager.standalone_regex_indices}
+    if manager.regex_set is None:
+        assert "^systemctl (start|stop|restart|enable|disable)" in standalone
+        assert "^:(){ :|:& };:" in standalone
+
+
+def test_unanchored_pattern_keeps_priority_over_later_anchored_one(make_database):
+    manager = make_database({
+        "rm -rf": {"risk": "HIGH", "explanation": "recursive delete"},
+        "^ls": {"risk": "SAFE", "explanation": "listing"},
+    })
+    try:
+        # A union would report ^ls, the leftmost match, ahead of the higher-priority rm -rf
+        assert manager.compiled_patterns[0][0] == "rm -rf"
+        assert manager._match_static_index("ls; rm -rf ~") == 0
+    finally:
+        manager.close()
+
+
+def test_backreference_pattern_is_matched_on_its_own(make_database):
+    manager = make_database({
+        "^(ab)\\1": {"risk": "LOW", "explanation": "repeated"},
+        "^ls": {"risk": "SAFE", "explanation": "listing"},
+    })
+    try:
+        index = manager._match_static_index("abab")
+        assert index is not None
+        assert manager.compiled_patterns[index][0] == "^(ab)\\1"
+        assert manager._match_static_index("abba") is None
+    finally:
+        manager.close()
+
+
+def test_aho_corasick_agrees_with_per_pattern_loop(manager):
+    pytest.importorskip("ahocorasick")
+    assert manager.literal_automaton is not None
+    for command in COMMANDS:
+        assert manager._match_static_index(command) == _loop_match(manager, command)
+
+
+def test_re2_set_agrees_with_per_pattern_loop(manager):
+    pytest.importorskip("re2")
+    assert manager.regex_set is not None
+    for command in COMMANDS:
+        assert manager._match_static_index(command) == _loop_match(manager, command)
+
+
+@pytest.mark.parametrize("command, decisive", [
+    ("ls -la", True),
+    ("rm -rf /", True),
+    ("ls; rm -rf ~", False),
+    ("ls | sh", False),
+    ("cat notes > /etc/passwd", False),
+    ("echo $(id)", False),
+    ("systemctl restart nginx", False),
+    ("nmap -sV 10.0.0.1", False),
+])
+def test_decisive_static_match(manager, command, decisive):
+    index = manager._match_static_index(command)
+    assert manager._is_decisive_static_match(command, index) is decisive
+
+
+def test_unconfident_entry_is_not_decisive(make_database):
+    manager = make_database({
+        "^rm -rf /": {"risk": "CRITICAL", "explanation": "wipe", "confident": False},
+    })
+    try:
+        index = manager._match_static_index("rm -rf /")
+        assert index is not None
+        assert not manager._is_decisive_static_match("rm -rf /", index)
+    finally:
+        manager.close()
@@ -0,0 +1,139 @@
+"""
+Session database migration from older schema versions
+"""
+import sqlite3
+
+import pytest
+
+from agent import session_manager as sm
+
+# history as first released, before the session, tool and timing columns
+V0_HISTORY = """
+CREATE TABLE history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    user_input TEXT NOT NULL,
+    executed_action TEXT NOT NULL,
+    action_type TEXT NOT NULL,
+    output TEXT,
+    risk_assessment TEXT
+)
+"""
+
+# history with tool names stored inline, before the tools table
+V1_HISTORY = """
+CREATE TABLE history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    user_input TEXT NOT NULL,
+    executed_action TEXT NOT NULL,
+    action_type TEXT NOT NULL,
+    tool_name TEXT,
+    output TEXT,
+    risk_assessment TEXT,
+    execution_time_ms INTEGER,
+    success BOOLEAN
+)
+"""
+
+V1_ROWS = [
+    ("old_session", "2024-01-01 10:00:00", "scan the host", "nmap -sV host", "tool", "nmap", "open ports", None, 1200, 1),
+    ("old_session", "2024-01-01 10:01:00", "list files", "ls -la", "command", None, "total 0", None, 5, 1),
+    ("old_session", "2024-01-01 10:02:00", "scan again", "nmap -p- host", "tool", "nmap", "", None, 900, 0),
+    ("old_session", "2024-01-01 10:03:00", "crack it", "john hashes.txt", "tool", "john", "", None, 50, 1),
+]
+
+
+def _build_v0(path):
+    conn = sqlite3.connect(path)
+    conn.execute(V0_HISTORY)
+    conn.executemany(
+        "INSERT INTO history (timestamp, user_input, executed_action, action_type, output) VALUES (?, ?, ?, ?, ?)",
+        [("2024-01-01 09:00:00", "who am i", "whoami", "command", "root"),
+         ("2024-01-01 09:01:00", "where am i", "pwd", "command", "/root")]
+    )
+    conn.commit()
+    conn.close()
+
+
+def _build_v1(path, user_version):
+    conn = sqlite3.connect(path)
+    conn.execute(V1_HISTORY)
+    conn.executemany(
+        "INSERT INTO history (session_id, timestamp, user_input, executed_action, action_type, tool_name, "
+        "output, risk_assessment, execution_time_ms, success) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        V1_ROWS
+    )
+    conn.execute(f"PRAGMA user_version = {user_version}")
+    conn.commit()
+    conn.close()
+
+
+@pytest.fixture
+def open_manager(tmp_path, monkeypatch):
+    db_path = tmp_path / "history.sqlite"
+    monkeypatch.setattr(sm.SessionManager, "_setup_database_path", lambda self: str(db_path))
+    managers = []
+
+    def open_manager(build):
+        build(str(db_path))
+        manager = sm.SessionManager()
+        managers.append(manager)
+        return manager
+
+    yield open_manager
+    for manager in managers:
+        manager.close()
+
+
+def _user_version(manager):
+    return manager._conn().execute("PRAGMA user_version").fetchone()[0]
+
+
+@pytest.mark.parametrize("user_version", [0, 1])
+def test_inline_tool_names_move_to_tools_table(open_manager, user_version):
+    manager = open_manager(lambda path: _build_v1(path, user_version))
+    conn = manager._conn()
+
+    assert _user_version(manager) == sm.SCHEMA_VERSION
+    assert conn.execute("SELECT COUNT(*) FROM history").fetchone()[0] == len(V1_ROWS)
+
+    # Raw rows reference the tools table and no longer carry the name inline
+    assert conn.execute("SELECT COUNT(*) FROM history WHERE tool_name IS NOT NULL").fetchone()[0] == 0
+    assert sorted(row[0] for row in conn.execute("SELECT name FROM tools")) == ["john", "nmap"]
+
+    rows = conn.execute(
+        "SELECT executed_action, tool_name, execution_time_ms, success FROM history_v ORDER BY id"
+    ).fetchall()
+    assert [tuple(row) for row in rows] == [
+        (action, tool_name, elapsed, success)
+        for _, _, _, action, _, tool_name, _, _, elapsed, success in V1_ROWS
+    ]
+
+
+def test_first_release_history_gains_new_columns(open_manager):
+    manager = open_manager(_build_v0)
+    conn = manager._conn()
+
+    assert _user_version(manager) == sm.SCHEMA_VERSION
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(history)")}
+    assert {name for name, _ in sm.HISTORY_COLUMN_MIGRATIONS} <= columns
+
+    rows = conn.execute("SELECT session_id, executed_action, tool_name FROM history_v ORDER BY id").fetchall()
+    assert [tuple(row) for row in rows] == [
+        ("legacy_session", "whoami", None),
+        ("legacy_session", "pwd", None),
+    ]
+
+
+def test_migrated_database_accepts_new_interactions(open_manager):
+    manager = open_manager(lambda path: _build_v1(path, 1))
+
+    manager.add_interaction("scan", "nmap host", "tool", tool_name="nmap")
+    manager.add_interaction("hash", "hashcat -m 0 h.txt", "tool", tool_name="hashcat")
+
+    recent = manager.get_recent_history(2)
+    assert [row["tool_name"] for row in recent] == ["hashcat", "nmap"]
+    tools = [row[0] for row in manager._conn().execute("SELECT name FROM tools ORDER BY id")]
+    assert sorted(tools) == ["hashcat", "john", "nmap"]
@@ -0,0 +1,51 @@
+"""
+Background session writer failure handling
+"""
+import threading
+
+import pytest
+
+from agent import session_manager as sm
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    monkeypatch.setattr(sm.SessionManager, "_setup_database_path", lambda self: str(tmp_path / "history.sqlite"))
+    manager = sm.SessionManager()
+    yield manager
+    manager.close()
+
+
+def _history_count(manager):
+    return manager._conn().execute("SELECT COUNT(*) FROM history").fetchone()[0]
+
+
+def _flush_within(manager, seconds=5.0):
+    flusher = threading.Thread(target=manager.flush, daemon=True)
+    flusher.start()
+    flusher.join(seconds)
+    return not flusher.is_alive()
+
+
+def test_flush_returns_after_non_sqlite_error_in_writer(manager):
+    # A malformed queued write raises ValueError inside the writer, not sqlite3.Error
+    manager._write_queue.put(("SELECT 1",))
+    manager.add_interaction("ls", "ls", "command")
+
+    assert _flush_within(manager)
+    assert manager._writer_alive()
+
+    manager.add_interaction("pwd", "pwd", "command")
+    assert _flush_within(manager)
+    assert _history_count(manager) >= 1
+
+
+def test_writes_are_committed_synchronously_when_writer_is_dead(manager):
+    manager._write_queue.put(sm._WRITER_STOP)
+    manager._writer.join(5.0)
+    assert not manager._writer_alive()
+
+    manager.add_interaction("whoami", "whoami", "command")
+
+    assert _flush_within(manager)
+    assert _history_count(manager) == 1